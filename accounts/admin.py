@@ -1,10 +1,23 @@
 from django.contrib import admin
-from .models import UserSettings
+from django.contrib.auth.admin import UserAdmin
+from .models import CustomUser, UserSettings
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(UserAdmin):
+    list_display = ['username', 'email', 'role', 'is_staff', 'is_active', 'date_joined']
+    list_filter = ['role', 'is_staff', 'is_superuser', 'is_active']
+    # Also what autocomplete fields pointing at users search
+    search_fields = ['username', 'email', 'first_name', 'last_name']
+    fieldsets = UserAdmin.fieldsets + (('Role', {'fields': ['role']}),)
+    add_fieldsets = UserAdmin.add_fieldsets + (('Role', {'fields': ['role']}),)
 
 
 @admin.register(UserSettings)
 class UserSettingsAdmin(admin.ModelAdmin):
     list_display = ['user', 'currency', 'created_at', 'updated_at']
     list_filter = ['currency', 'created_at']
+    list_select_related = ['user']
     search_fields = ['user__username', 'user__email']
+    autocomplete_fields = ['user']
     readonly_fields = ['created_at', 'updated_at']
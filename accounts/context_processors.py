@@ -1,25 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
 from .models import UserSettings
 
 
 def user_settings(request):
     """
-    Context processor to make user settings available in all templates
+    Context processor to make user settings available in all templates.
+    Settings come from the cache and are only loaded if a template uses them.
     """
     if request.user.is_authenticated:
-        try:
-            settings = UserSettings.objects.get(user=request.user)
-            return {
-                'user_settings': settings,
-                'currency_symbol': settings.get_currency_symbol(),
-            }
-        except UserSettings.DoesNotExist:
-            # Create default settings if they don't exist
-            settings = UserSettings.objects.create(user=request.user)
-            return {
-                'user_settings': settings,
-                'currency_symbol': settings.get_currency_symbol(),
-            }
+        return {
+            'user_settings': SimpleLazyObject(lambda: UserSettings.for_request(request)),
+            'currency_symbol': SimpleLazyObject(
+                lambda: UserSettings.for_request(request).get_currency_symbol()
+            ),
+        }
     return {
         'user_settings': None,
         'currency_symbol': '$',  # Default for anonymous users
-    }
\ No newline at end of file
+    }
@@ -1,37 +1,57 @@
+import asyncio
 from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseForbidden
 from django.shortcuts import render
 
+# Role hierarchy: a role may do everything the roles below it can
+ROLE_HIERARCHY = {
+    'viewer': 1,
+    'reader': 2,
+    'admin': 3
+}
+
 
 def role_required(role):
     """
     Decorator to require a specific role or higher.
     Role hierarchy: admin > reader > viewer
+    Works for both sync and async views.
     """
+    required_level = ROLE_HIERARCHY.get(role, 0)
+
+    def forbidden(request):
+        return render(request, 'errors/403.html', {
+            'message': f'You need {role} role or higher to access this page.'
+        }, status=403)
+
     def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                # request.user is resolved lazily from the session, which hits the database
+                user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+                if user is None:
+                    return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+                if ROLE_HIERARCHY.get(user.role, 0) >= required_level:
+                    return await view_func(request, *args, **kwargs)
+                return await sync_to_async(forbidden)(request)
+
+            return _wrapped_async_view
+
         @wraps(view_func)
         @login_required
         def _wrapped_view(request, *args, **kwargs):
-            user_role = request.user.role
-            
-            # Define role hierarchy
-            role_hierarchy = {
-                'viewer': 1,
-                'reader': 2, 
-                'admin': 3
-            }
-            
-            required_level = role_hierarchy.get(role, 0)
-            user_level = role_hierarchy.get(user_role, 0)
+            user_level = ROLE_HIERARCHY.get(request.user.role, 0)
             
             if user_level >= required_level:
                 return view_func(request, *args, **kwargs)
             else:
-                return render(request, 'errors/403.html', {
-                    'message': f'You need {role} role or higher to access this page.'
-                }, status=403)
+                return forbidden(request)
         
         return _wrapped_view
     return decorator
@@ -1,6 +1,10 @@
-from django.db import models
+import time
+
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.conf import settings
+from django.core.cache import cache
+from config.instrumentation import record_cache
 
 
 class CustomUserManager(UserManager):
@@ -86,3 +90,64 @@ class UserSettings(models.Model):
     def get_or_create_for_user(cls, user):
         settings, created = cls.objects.get_or_create(user=user)
         return settings
+
+    # Bump when the cached representation changes shape
+    CACHE_VERSION = 1
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def _cache_version_key(user_id):
+        return f'accounts:user_settings_version:{user_id}'
+
+    @classmethod
+    def _cache_key(cls, user_id):
+        # Seeded from the clock, so a version key that was evicted never comes back as an old version
+        version = cache.get_or_set(cls._cache_version_key(user_id), int(time.time()), None)
+        return f'accounts:user_settings:{user_id}:{version}'
+
+    @classmethod
+    def get_cached_for_user(cls, user):
+        """
+        Like get_or_create_for_user(), but served from the cache framework.
+        Entries are keyed by a per-user version that save() bumps, so a change
+        is visible on the next request from any device.
+        """
+        key = cls._cache_key(user.pk)
+        settings = cache.get(key, version=cls.CACHE_VERSION)
+        record_cache('user_settings', hit=settings is not None)
+        if settings is None:
+            settings = cls.get_or_create_for_user(user)
+            # Creating the row bumps the version, so re-read the key before storing
+            cache.set(cls._cache_key(user.pk), settings, cls.CACHE_TIMEOUT, version=cls.CACHE_VERSION)
+        return settings
+
+    @classmethod
+    def invalidate_cache(cls, user_id):
+        version_key = cls._cache_version_key(user_id)
+
+        def bump():
+            try:
+                cache.incr(version_key)
+            except ValueError:
+                # Version key was evicted; a fixed number could match an entry still cached under it
+                cache.set(version_key, int(time.time()), None)
+
+        # After the commit, so a concurrent request can't cache the old row under the new version
+        transaction.on_commit(bump)
+
+    @classmethod
+    def for_request(cls, request):
+        """Cached settings for request.user, loaded at most once per request"""
+        if not hasattr(request, '_user_settings'):
+            request._user_settings = cls.get_cached_for_user(request.user)
+        return request._user_settings
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_cache(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        self.invalidate_cache(user_id)
+        return result
@@ -0,0 +1,19 @@
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .decorators import ROLE_HIERARCHY
+
+
+class RolePermission(BasePermission):
+    """
+    DRF counterpart of accounts.decorators: viewer role or higher to read,
+    reader role or higher to create, change or delete.
+    """
+    read_role = 'viewer'
+    write_role = 'reader'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        required = self.read_role if request.method in SAFE_METHODS else self.write_role
+        return ROLE_HIERARCHY.get(user.role, 0) >= ROLE_HIERARCHY[required]
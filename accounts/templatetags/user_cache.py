@@ -0,0 +1,22 @@
+from django import template
+
+from config.caching import user_cache_version
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def user_cache_version_for(context, user=None):
+    """
+    Current cache version for a user, for per-user template fragments:
+
+        {% load cache user_cache %}
+        {% user_cache_version_for as version %}
+        {% cache 300 meter_sidebar request.user.pk version %}...{% endcache %}
+
+    The fragment is rebuilt as soon as any of the user's meters or readings change.
+    """
+    user = user or context['request'].user
+    if not user.is_authenticated:
+        return 0
+    return user_cache_version(user.pk)
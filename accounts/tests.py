@@ -1,3 +1,85 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from config.testing import Budget, PageBudgetTestCase
+from utilities.models import WaterMeter, WaterReading
+
+from .models import CustomUser, UserSettings
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'accounts-tests'}}
+
+
+class PageBudgetTests(PageBudgetTestCase):
+    urlconf = 'accounts.urls'
+    budgets = {
+        'user_settings': Budget(max_bytes=20_000),
+        'user_management': Budget(max_bytes=40_000),
+        'add_user': Budget(max_bytes=20_000),
+        'edit_user': Budget(max_bytes=20_000, kwargs=lambda h: {'user_id': h.other_user.pk}),
+        'delete_user': Budget(max_bytes=15_000, kwargs=lambda h: {'user_id': h.other_user.pk}),
+    }
+
+
+@override_settings(CACHES=LOCMEM)
+class UserSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('owner', password='x')
+
+    def change_currency(self, currency, commit=True):
+        settings = UserSettings.get_or_create_for_user(self.user)
+        settings.currency = currency
+        if not commit:
+            settings.save()
+            return
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+
+    def test_save_is_visible_on_next_read(self):
+        self.assertEqual(UserSettings.get_cached_for_user(self.user).currency, 'USD')
+        self.change_currency('EUR')
+        self.assertEqual(UserSettings.get_cached_for_user(self.user).currency, 'EUR')
+
+    def test_evicted_version_does_not_resurrect_old_entries(self):
+        # Each read of the clock a second later than the last, as between real requests
+        clock = mock.Mock(time=mock.Mock(side_effect=range(1000, 2000)))
+        with mock.patch('accounts.models.time', clock):
+            UserSettings.get_cached_for_user(self.user)
+            self.change_currency('EUR')
+            self.assertEqual(UserSettings.get_cached_for_user(self.user).currency, 'EUR')
+
+            cache.delete(UserSettings._cache_version_key(self.user.pk))
+            self.change_currency('GBP')
+            self.assertEqual(UserSettings.get_cached_for_user(self.user).currency, 'GBP')
+
+    def test_version_bumps_after_commit(self):
+        UserSettings.get_cached_for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change_currency('EUR', commit=False)
+            # Until the commit, readers keep the old entry rather than caching an uncommitted row
+            self.assertEqual(UserSettings.get_cached_for_user(self.user).currency, 'USD')
+        self.assertEqual(UserSettings.get_cached_for_user(self.user).currency, 'EUR')
+
+
+class UserManagementTests(TestCase):
+    def test_stats_come_from_meter_snapshots(self):
+        admin = CustomUser.objects.create_user('boss', password='x', role='admin')
+        meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=admin)
+        WaterMeter.objects.create(name='Garden', meter_type='cold', user=admin)
+        taken = timezone.now() - timedelta(hours=1)
+        for hours, value in ((1, '10'), (0, '12')):
+            WaterReading.objects.create(
+                meter=meter, image='water_readings/test.jpg', timestamp=taken - timedelta(hours=hours),
+                reading_value=Decimal(value), processed=True,
+            )
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse('settings:user_management'))
+        row = response.context['users'][0]
+        self.assertEqual((row.meter_count, row.reading_count, row.last_reading_at), (2, 2, taken))
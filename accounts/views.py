@@ -3,9 +3,14 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
 from .models import UserSettings, CustomUser
 from .decorators import viewer_required, admin_required
 
+USERS_PAGE_SIZE = 25
+
 
 class UserSettingsForm(forms.ModelForm):
     class Meta:
@@ -55,7 +60,7 @@ class UserEditForm(forms.ModelForm):
 
 @viewer_required
 def user_settings(request):
-    settings = UserSettings.get_or_create_for_user(request.user)
+    settings = UserSettings.for_request(request)
     
     if request.method == 'POST':
         form = UserSettingsForm(request.POST, instance=settings)
@@ -74,8 +79,32 @@ def user_settings(request):
 
 @admin_required
 def user_management(request):
-    users = CustomUser.objects.all().order_by('username')
-    return render(request, 'accounts/user_management.html', {'users': users})
+    query = request.GET.get('q', '').strip()
+    users = CustomUser.objects.order_by('username')
+    if query:
+        users = users.filter(
+            Q(username__icontains=query)
+            | Q(email__icontains=query)
+            | Q(first_name__icontains=query)
+            | Q(last_name__icontains=query)
+        )
+
+    # Per-user stats in the same query: meters are joined once and the reading
+    # totals come from each meter's snapshot, so readings are never touched
+    users = users.annotate(
+        meter_count=Count('watermeter'),
+        reading_count=Coalesce(Sum('watermeter__reading_count'), 0),
+        last_reading_at=Max('watermeter__latest_reading_at'),
+    )
+
+    paginator = Paginator(users, USERS_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+
+    return render(request, 'accounts/user_management.html', {
+        'users': page,
+        'page': page,
+        'query': query,
+    })
 
 
 @admin_required
@@ -0,0 +1,140 @@
+"""
+Cache helpers on top of Django's cache framework.
+
+The backend is Redis when REDIS_URL is set and a local-memory (or file) cache
+otherwise (see CACHES in config/settings.py), so everything here works the
+same in development and tests.
+
+Per-user entries embed a version number; invalidate_user_cache() bumps it,
+which orphans every cached view and fragment for that user at once.
+"""
+
+import asyncio
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+
+from .instrumentation import record_cache
+
+USER_VERSION_TIMEOUT = None  # version counters never expire
+LOCK_TIMEOUT = 30
+STALE_WAIT = 2.0
+
+
+def _version_key(user_id):
+    return f'cache:user_version:{user_id}'
+
+
+def user_cache_version(user_id):
+    # Seeded from the clock, so a version key that was evicted never comes back as an old version
+    return cache.get_or_set(_version_key(user_id), int(time.time()), USER_VERSION_TIMEOUT)
+
+
+def invalidate_user_cache(user_id):
+    """Drop every per-user cache entry for ``user_id`` once the current transaction commits"""
+    def bump():
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), int(time.time()), USER_VERSION_TIMEOUT)
+
+    transaction.on_commit(bump)
+
+
+def user_cache_key(user_id, *parts):
+    version = user_cache_version(user_id)
+    return ':'.join(['cache:user', str(user_id), str(version), *map(str, parts)])
+
+
+def get_or_compute(key, compute, timeout, name='computed'):
+    """
+    Return the cached value for ``key``, calling ``compute()`` on a miss.
+    ``name`` labels the hit/miss metrics.
+
+    Stampede protection: entries carry a soft expiry at ``timeout`` and live in
+    the cache for twice that. Once stale, only the caller that wins a cache.add()
+    lock recomputes; everyone else keeps getting the stale value. On a cold miss,
+    losers wait briefly for the winner instead of all hitting the database.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and entry[1] > now:
+        record_cache(name, hit=True)
+        return entry[0]
+    # Stale entries count as misses even when a stale value is returned below
+    record_cache(name, hit=False)
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, (value, time.time() + timeout), timeout * 2)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry[0]
+
+    deadline = now + STALE_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    # The winner is slow or died; compute without caching rather than fail
+    return compute()
+
+
+def cache_per_user(timeout):
+    """
+    Cache successful GET responses per user, path and query string.
+
+    Bypassed while the user has flash messages waiting, so a cached page never
+    swallows or replays a message. Works on sync and async views.
+    """
+    def cacheable(request):
+        if request.method != 'GET' or not request.user.is_authenticated:
+            return False
+        storage = getattr(request, '_messages', None)
+        return not (storage is not None and len(storage))
+
+    def lookup(request):
+        if not cacheable(request):
+            return None, None
+        key = user_cache_key(request.user.pk, 'view', request.get_full_path())
+        cached = cache.get(key)
+        record_cache('view', hit=cached is not None)
+        return key, cached
+
+    def store(key, response):
+        if key is not None and response.status_code == 200 and not response.streaming:
+            patch_cache_control(response, private=True)
+            cache.set(key, response, timeout)
+        return response
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                key, cached = await sync_to_async(lookup)(request)
+                if cached is not None:
+                    return cached
+                response = await view_func(request, *args, **kwargs)
+                return await sync_to_async(store)(key, response)
+
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            key, cached = lookup(request)
+            if cached is not None:
+                return cached
+            return store(key, view_func(request, *args, **kwargs))
+
+        return _wrapped_view
+    return decorator
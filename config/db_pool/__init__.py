@@ -0,0 +1,8 @@
+"""
+PostgreSQL backend with a process-wide connection pool.
+
+Enable with ``DB_POOL=pool`` (see config/settings.py). Pool options live in
+``DATABASES[alias]['POOL']``.
+"""
+
+from .pool import pool_stats  # noqa: F401
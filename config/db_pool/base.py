@@ -0,0 +1,53 @@
+from django.db.backends.postgresql import base as postgresql_base
+
+from .pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(postgresql_base.DatabaseWrapper):
+    """
+    PostgreSQL wrapper that checks connections out of a shared pool instead of
+    opening one per request, and hands them back when Django closes them.
+    """
+
+    def _get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+
+        def connect():
+            connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+            return connection, self.isolation_level
+
+        def factory():
+            return ConnectionPool(
+                connect,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10.0),
+                max_lifetime=options.get('MAX_LIFETIME', 1800.0),
+                health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30.0),
+            )
+
+        return get_pool(self.alias, factory)
+
+    def get_new_connection(self, conn_params):
+        pool = self._get_pool(conn_params)
+        connection, created_at, isolation_level = pool.acquire()
+        self.isolation_level = isolation_level
+        self._pool = pool
+        self._pool_created_at = created_at
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = getattr(self, '_pool', None)
+        if pool is None:
+            return super()._close()
+
+        broken = bool(self.connection.closed)
+        if not broken:
+            try:
+                # Never hand out a connection with an open transaction
+                self.connection.rollback()
+            except Exception:
+                broken = True
+        pool.release(self.connection, self._pool_created_at, self.isolation_level, broken=broken)
+        self._pool = None
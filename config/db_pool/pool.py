@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe LIFO pool of DB-API connections.
+
+    Connections are health-checked on checkout when they have been idle for
+    longer than ``health_check_interval`` and are retired once they exceed
+    ``max_lifetime``. The pool is bound to the process that created it, so
+    connections are never shared across a gunicorn fork.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10.0, max_lifetime=1800.0,
+                 health_check_interval=30.0):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.pid = os.getpid()
+
+        self._idle = deque()  # (connection, created_at, returned_at, extra)
+        self._size = 0
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def acquire(self):
+        """Return ``(connection, created_at, extra)``, opening a new connection if needed"""
+        started = time.monotonic()
+        waited = False
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        # Still counted in _size, so the slot stays ours during the check
+                        candidate = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f'No database connection available after {self.timeout}s '
+                            f'(pool size {self.max_size})'
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+            if candidate is None:
+                break
+
+            # The health check may round-trip to the server; never hold the lock for it
+            conn, created_at, returned_at, extra = candidate
+            if self._usable(conn, created_at, returned_at):
+                with self._cond:
+                    self._record_checkout(started, waited, reused=True)
+                return conn, created_at, extra
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self.discarded += 1
+                self._cond.notify()
+
+        # Open the new connection outside the lock
+        try:
+            conn, extra = self.connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            self._record_checkout(started, waited, reused=False)
+        return conn, time.monotonic(), extra
+
+    def release(self, conn, created_at, extra=None, broken=False):
+        with self._cond:
+            if broken or os.getpid() != self.pid or time.monotonic() - created_at > self.max_lifetime:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic(), extra))
+            self._cond.notify()
+
+    def _usable(self, conn, created_at, returned_at):
+        now = time.monotonic()
+        if getattr(conn, 'closed', False) or now - created_at > self.max_lifetime:
+            return False
+        if now - returned_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            logger.info('Discarding pooled database connection that failed its health check')
+            return False
+
+    def _discard(self, conn):
+        # Caller holds the lock
+        self._size -= 1
+        self.discarded += 1
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _record_checkout(self, started, waited, reused):
+        self.checkouts += 1
+        if reused:
+            self.reused += 1
+        if waited:
+            wait = time.monotonic() - started
+            self.wait_count += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'checkouts': self.checkouts,
+                'reuse_ratio': (self.reused / self.checkouts) if self.checkouts else 0.0,
+                'wait_count': self.wait_count,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+            }
+
+
+def get_pool(alias, factory):
+    """Return the pool for ``alias`` in this process, creating it with ``factory()``"""
+    pid = os.getpid()
+    pool = _pools.get(alias)
+    if pool is not None and pool.pid == pid:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != pid:
+            # Never reuse a pool (or its sockets) inherited from a parent process
+            pool = factory()
+            _pools[alias] = pool
+        return pool
+
+
+def pool_stats():
+    pid = os.getpid()
+    return {alias: pool.stats() for alias, pool in list(_pools.items()) if pool.pid == pid}
@@ -0,0 +1,102 @@
+"""
+Read-replica routing.
+
+Reads are only sent to the ``replica`` alias inside views wrapped with
+``use_replica`` and only for models in ``DATABASE_REPLICA_APPS``. Everything
+else, all writes, and any request made shortly after the same client wrote
+something (read-your-writes stickiness) use ``default``. When no replica is
+configured every read falls back to ``default``.
+"""
+
+import asyncio
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA_ALIAS = 'replica'
+STICKY_COOKIE = 'homehub_db_pin'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_available():
+    return REPLICA_ALIAS in connections.databases
+
+
+def _is_pinned(request):
+    try:
+        pinned_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except (TypeError, ValueError):
+        return False
+    return pinned_until > time.time()
+
+
+def use_replica(view_func):
+    """Decorator for read-only views whose queries may be served by the replica"""
+    if asyncio.iscoroutinefunction(view_func):
+        # sync_to_async copies the context, so ORM calls made from the view see the flag
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or _is_pinned(request):
+                return await view_func(request, *args, **kwargs)
+            token = _replica_reads.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or _is_pinned(request):
+            return view_func(request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not replica_available():
+            return None
+        if model._meta.app_label in getattr(settings, 'DATABASE_REPLICA_APPS', ()):
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """
+    Pin a client to the primary for REPLICA_STICKY_SECONDS after it writes,
+    so a redirect after POST never shows data the replica has not caught up on.
+    """
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_available():
+            sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + sticky_seconds),
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
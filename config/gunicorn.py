@@ -0,0 +1,116 @@
+"""
+gunicorn settings for the web (WSGI) and events (ASGI) services.
+
+    gunicorn -c config/gunicorn.py config.wsgi:application
+    GUNICORN_MODE=asgi gunicorn -c config/gunicorn.py config.asgi:application
+
+Workers and threads are sized from the CPUs available to the container and
+from GUNICORN_WORKLOAD:
+
+- ``io`` (default): requests mostly wait on Gemini and PostgreSQL, so fewer
+  processes with several threads each
+- ``cpu``: one thread per process, classic ``2 * CPUs + 1`` sync workers
+
+WEB_CONCURRENCY and GUNICORN_THREADS override the computed values. The app is
+preloaded in the master so imports and compiled templates are shared
+copy-on-write, and each worker opens its connections before it accepts
+requests (see config/warmup.py).
+"""
+
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def available_cpus():
+    """CPUs this process may use, honouring cpusets and cgroup v2 CPU quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+MODE = os.environ.get('GUNICORN_MODE', 'wsgi')
+WORKLOAD = os.environ.get('GUNICORN_WORKLOAD', 'io')
+CPUS = available_cpus()
+
+if MODE == 'asgi':
+    # One event loop per CPU; concurrency comes from the loop, not threads
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    default_workers, default_threads = CPUS, 1
+elif WORKLOAD == 'cpu':
+    worker_class = 'sync'
+    default_workers, default_threads = 2 * CPUS + 1, 1
+else:
+    worker_class = 'gthread'
+    default_workers, default_threads = CPUS + 1, 8
+
+workers = min(_env_int('WEB_CONCURRENCY', default_workers), _env_int('GUNICORN_MAX_WORKERS', 12))
+threads = _env_int('GUNICORN_THREADS', default_threads)
+if threads > 1 and worker_class == 'sync':
+    worker_class = 'gthread'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8001' if MODE == 'asgi' else '0.0.0.0:8000')
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# A Gemini call plus image decoding can take tens of seconds; the default 30s kills workers mid-upload
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = 5
+# Recycle workers now and then to bound slow leaks; jitter keeps them from restarting together
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = max_requests // 10
+# Heartbeat files on tmpfs; a container overlay filesystem can stall them and trigger false timeouts
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    logger.info(
+        'Starting %d %s worker(s) x %d thread(s) (%d CPUs, mode=%s, workload=%s, preload=%s)',
+        workers, worker_class, threads, CPUS, MODE, WORKLOAD, preload_app,
+    )
+    if not preload_app:
+        return
+    from django.db import connections
+
+    from config import warmup
+
+    started = time.monotonic()
+    warmup.warm_up_process()
+    logger.info('Preloaded app warmed up in %.2fs', time.monotonic() - started)
+    # Nothing opened in the master may leak into forked workers
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    from config import warmup
+
+    started = time.monotonic()
+    try:
+        if not preload_app:
+            warmup.warm_up_process()
+        warmup.warm_up_worker(db_connections=threads)
+        logger.info('Worker %s warmed up in %.2fs', worker.pid, time.monotonic() - started)
+    except Exception:
+        # Keep the worker; /healthz/ready/ retries the warm-up and reports 503 until it succeeds
+        logger.exception('Worker warm-up failed')
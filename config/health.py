@@ -0,0 +1,63 @@
+"""
+Liveness and readiness probes.
+
+They are answered by a middleware placed first in MIDDLEWARE, so probes skip
+sessions, auth and ALLOWED_HOSTS checks (orchestrators and Docker probe by IP).
+
+- /healthz/live/  - the process is serving requests; nothing else is checked
+- /healthz/ready/ - this worker is warmed up and can reach the database and cache
+"""
+
+import logging
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from . import warmup
+
+logger = logging.getLogger(__name__)
+
+LIVENESS_PATH = '/healthz/live/'
+READINESS_PATH = '/healthz/ready/'
+
+
+def liveness():
+    return JsonResponse({'status': 'ok'})
+
+
+def readiness():
+    checks = {}
+    try:
+        # Servers started without the gunicorn hooks (runserver, bare uvicorn) warm up on the first probe
+        warmup.warm_up_worker()
+        checks['warmup'] = 'ok'
+    except Exception as e:
+        logger.warning('Readiness: warm-up failed: %s', e)
+        checks['warmup'] = 'error'
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checks['database'] = 'ok'
+    except Exception as e:
+        logger.warning('Readiness: database check failed: %s', e)
+        checks['database'] = 'error'
+    try:
+        cache.set('healthz:ready', 1, 10)
+        checks['cache'] = 'ok' if cache.get('healthz:ready') == 1 else 'error'
+    except Exception as e:
+        logger.warning('Readiness: cache check failed: %s', e)
+        checks['cache'] = 'error'
+
+    ready = all(result == 'ok' for result in checks.values())
+    return JsonResponse({'status': 'ok' if ready else 'unavailable', 'checks': checks}, status=200 if ready else 503)
+
+
+class HealthCheckMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        if request.path == LIVENESS_PATH:
+            return liveness()
+        if request.path == READINESS_PATH:
+            return readiness()
+        return None
@@ -0,0 +1,130 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times every request and, through a context variable,
+collects what the request did: SQL statements (recorded by an execute
+wrapper installed on every new database connection) and application cache
+hits and misses (reported by config.caching and UserSettings). Results feed
+the histograms in config.metrics; requests slower than SLOW_REQUEST_SECONDS
+are logged with their slowest queries.
+
+The context variable is copied into sync_to_async threads, so ORM calls made
+from async views are attributed to the right request as well.
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG_COUNT = 5
+SLOW_QUERY_SQL_CHARS = 500
+
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = []  # (seconds, sql)
+        self.db_seconds = 0.0
+        self.cache_hits = {}
+        self.cache_misses = {}
+
+
+def record_cache(name, hit):
+    """Count an application cache lookup against the current request, if any"""
+    stats = _current.get()
+    if stats is None:
+        return
+    counts = stats.cache_hits if hit else stats.cache_misses
+    counts[name] = counts.get(name, 0) + 1
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.db_seconds += elapsed
+        stats.queries.append((elapsed, sql))
+
+
+@receiver(connection_created)
+def _install_query_recorder(sender, connection, **kwargs):
+    # connection_created fires again whenever the wrapper reconnects
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'SLOW_REQUEST_SECONDS', 1.0)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def _finish(self, request, response, stats, elapsed):
+        # For streaming responses (SSE, exports) this is the time to the first byte
+        view = _view_name(request)
+        metrics.REQUEST_DURATION.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_DB_QUERIES.observe(len(stats.queries), view=view)
+        metrics.REQUEST_DB_DURATION.observe(stats.db_seconds, view=view)
+        for name, count in stats.cache_hits.items():
+            metrics.CACHE_REQUESTS.inc(count, view=view, cache=name, result='hit')
+        for name, count in stats.cache_misses.items():
+            metrics.CACHE_REQUESTS.inc(count, view=view, cache=name, result='miss')
+
+        if elapsed >= self.slow_seconds:
+            slowest = sorted(stats.queries, key=lambda query: query[0], reverse=True)[:SLOW_QUERY_LOG_COUNT]
+            logger.warning(
+                'Slow request: %s %s (%s) took %.3fs, %d queries in %.3fs%s',
+                request.method, request.path, view, elapsed, len(stats.queries), stats.db_seconds,
+                ''.join(f'\n  {seconds * 1000:.1f}ms  {sql[:SLOW_QUERY_SQL_CHARS]}' for seconds, sql in slowest),
+            )
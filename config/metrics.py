@@ -0,0 +1,141 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Values are kept per worker process, like the connection pool counters in
+config/db_pool; scrape each worker (or run one worker per container) to see
+all of them. Observations only take a lock and bump a few integers, so they
+are cheap enough to record on every request.
+"""
+
+import bisect
+import threading
+
+from .db_pool import pool_stats
+
+# Seconds; spans fast cached pages up to slow Gemini calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self, items):
+        return [f'{self.name}_total{_format_labels(key)} {value}' for key, value in items]
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {cumulative}')
+        return lines
+
+
+REGISTRY = []
+
+REQUEST_DURATION = Histogram(
+    'homehub_request_duration_seconds', 'Wall time per request, by view',
+    ['view', 'method', 'status'],
+)
+REQUEST_DB_QUERIES = Histogram(
+    'homehub_request_db_queries', 'SQL queries per request, by view',
+    ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'homehub_request_db_duration_seconds', 'Time spent in SQL per request, by view',
+    ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'homehub_cache_requests', 'Application cache lookups, by view, cache and result (hit or miss)',
+    ['view', 'cache', 'result'],
+)
+OCR_DURATION = Histogram(
+    'homehub_ocr_duration_seconds', 'Gemini OCR call latency, by outcome (ok, unclear, error)',
+    ['mode', 'outcome'],
+)
+
+
+POOL_SAMPLES = (
+    # (stats field, metric name, type, help)
+    ('size', 'homehub_db_pool_connections', 'gauge', 'Open pooled database connections'),
+    ('in_use', 'homehub_db_pool_connections_in_use', 'gauge', 'Pooled database connections checked out'),
+    ('max_size', 'homehub_db_pool_max_connections', 'gauge', 'Database connection pool size limit'),
+    ('wait_count', 'homehub_db_pool_waits_total', 'counter', 'Checkouts that had to wait for a free connection'),
+    ('wait_seconds_total', 'homehub_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a free connection'),
+)
+
+
+def _render_pool_samples():
+    pools = pool_stats()
+    if not pools:
+        return []
+    lines = []
+    for field, name, kind, documentation in POOL_SAMPLES:
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{_format_labels((("alias", alias),))} {stats[field]}' for alias, stats in pools.items()]
+    return lines
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_render_pool_samples())
+    return '\n'.join(lines) + '\n'
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.health.HealthCheckMiddleware',
+    'config.instrumentation.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.db_routers.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -96,6 +99,133 @@ DATABASES = {
     }
 }
 
+# Connection reuse. DB_POOL selects one of:
+#   off        - open and close a connection per request
+#   persistent - keep one health-checked connection per worker thread (default)
+#   pool       - process-wide pool shared by all threads (config/db_pool), also safe under ASGI
+DB_POOL = config('DB_POOL', default='persistent')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+SERVER_INTERFACE = config('DJANGO_SERVER_INTERFACE', default='wsgi')
+# Route upload/edit/usage-data to their async implementations (utilities/views.py)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=SERVER_INTERFACE == 'asgi', cast=bool)
+
+if DB_POOL == 'pool':
+    DATABASES['default'].update({
+        'ENGINE': 'config.db_pool',
+        # Connections go back to the pool at the end of every request
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800.0, cast=float),
+            'HEALTH_CHECK_INTERVAL': config('DB_POOL_HEALTH_CHECK_INTERVAL', default=30.0, cast=float),
+        },
+    })
+elif DB_POOL == 'persistent' and SERVER_INTERFACE != 'asgi':
+    # Persistent per-thread connections leak under ASGI, where each request may run on a new thread
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Optional read replica for analytics and listing views (see config/db_routers.py).
+# Without DB_REPLICA_HOST every query goes to the default database.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.db_routers.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['utilities']
+# Seconds a client keeps reading from the primary after a write
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
+
+# Cache
+# Redis when REDIS_URL is set (shared by all workers), otherwise a per-process
+# local-memory cache, or a file cache shared by workers on one host if CACHE_DIR is set.
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_DIR = config('CACHE_DIR', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'homehub',
+            'TIMEOUT': 300,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'KEY_PREFIX': 'homehub',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'homehub',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+# Performance instrumentation (config/instrumentation.py, metrics at /metrics/)
+# Requests slower than this are logged with their slowest queries
+SLOW_REQUEST_SECONDS = config('SLOW_REQUEST_SECONDS', default=1.0, cast=float)
+# Bearer token that lets a Prometheus scraper read /metrics/ without logging in (empty: admins only)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Span tracing of the upload pipeline (config/tracing.py), in OpenTelemetry's OTLP/JSON format.
+# TRACING_EXPORTER: empty (off), 'file' (JSON lines at TRACING_FILE) or 'otlp' (HTTP collector)
+TRACING_EXPORTER = config('TRACING_EXPORTER', default='')
+TRACING_FILE = config('TRACING_FILE', default=str(BASE_DIR / 'traces' / 'traces.jsonl'))
+TRACING_OTLP_ENDPOINT = config('TRACING_OTLP_ENDPOINT', default='http://localhost:4318/v1/traces')
+TRACING_SERVICE_NAME = config('TRACING_SERVICE_NAME', default='homehub')
+
+# Console logging with the current trace and span IDs on every line
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'trace_context': {'()': 'config.tracing.TraceContextFilter'},
+    },
+    'formatters': {
+        'traced': {
+            'format': '%(asctime)s %(levelname)s %(name)s [trace=%(trace_id)s span=%(span_id)s] %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['trace_context'],
+            'formatter': 'traced',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': config('LOG_LEVEL', default='INFO'),
+    },
+    'loggers': {
+        # Replaces Django's DEBUG-only console handler instead of logging twice
+        'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -138,6 +268,22 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hashed filenames plus pre-compressed .gz/.br copies, served by nginx with gzip_static.
+# Needs a collectstatic run, so it is off by default while DEBUG is on.
+STATIC_HASHED = config('STATIC_HASHED', default=not DEBUG, cast=bool)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'config.storage.CompressedManifestStaticFilesStorage' if STATIC_HASHED
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -153,6 +299,24 @@ LOGIN_URL = '/accounts/login/'
 
 # Gemini API
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+# Point OCR at another server, e.g. the local stub used by `manage.py load_test`.
+# The SDK only supports custom endpoints over REST, so that becomes the default transport.
+GEMINI_API_ENDPOINT = config('GEMINI_API_ENDPOINT', default='')
+GEMINI_TRANSPORT = config('GEMINI_TRANSPORT', default='rest' if GEMINI_API_ENDPOINT else '')
+
+# Reading retention (`manage.py apply_retention`): raw readings older than these
+# are compacted to the last reading of each day, then of each month
+RETENTION_DAILY_AFTER_DAYS = config('RETENTION_DAILY_AFTER_DAYS', default=365, cast=int)
+RETENTION_MONTHLY_AFTER_DAYS = config('RETENTION_MONTHLY_AFTER_DAYS', default=3 * 365, cast=int)
+
+# How far the delta sync API (utilities/api.py SyncView) looks back for rows
+# committed after a client's last sync; writes whose transaction takes longer
+# than this to commit can be missed by clients that synced meanwhile
+SYNC_SAFETY_SECONDS = config('SYNC_SAFETY_SECONDS', default=300, cast=int)
+
+# Keep a packed per-meter-month copy of processed readings for analytics
+# (utilities/series.py); run `manage.py rebuild_series` after turning it on
+SERIES_STORE = config('SERIES_STORE', default=False, cast=bool)
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
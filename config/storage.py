@@ -0,0 +1,60 @@
+"""
+Static files storage for production builds.
+
+collectstatic writes content-hashed copies of every file (so nginx can send
+them with ``Cache-Control: immutable``) plus pre-compressed ``.gz`` and, when
+the ``brotli`` package is installed, ``.br`` siblings for text assets. nginx
+serves those variants directly via ``gzip_static``/``brotli_static`` instead
+of compressing on every request.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional; only .gz variants are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.ttf', '.eot')
+MIN_COMPRESS_SIZE = 1024
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # Unhashed originals are kept too, for anything that links them directly
+        for name in {*paths, *self.hashed_files.values()}:
+            self._compress(name)
+
+    def _compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = self.path(name)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        stat = os.stat(path)
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            self._write_variant(path + '.gz', compressed, stat)
+        if brotli is not None:
+            compressed = brotli.compress(content, quality=11)
+            if len(compressed) < len(content):
+                self._write_variant(path + '.br', compressed, stat)
+
+    @staticmethod
+    def _write_variant(path, data, stat):
+        with open(path, 'wb') as f:
+            f.write(data)
+        # nginx takes Last-Modified (and so the ETag) from the variant it serves
+        os.utime(path, (stat.st_atime, stat.st_mtime))
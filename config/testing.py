@@ -0,0 +1,164 @@
+"""
+Query-count and response budgets for every page of an app.
+
+A PageBudgetTestCase subclass names a URLconf module and declares a Budget
+for each named URL in it (or excludes it with a reason). The test seeds a
+small and a large synthetic dataset (utilities.synthetic), requests every
+URL once as a user from each, and checks that:
+
+- the number of SQL queries is the same at both sizes, so an N+1 such as
+  ``{{ reading.meter.name }}`` in a loop without select_related fails
+- the response is no bigger than ``max_bytes`` and no slower than ``max_ms``
+  at the large size
+
+A URL added without a budget fails the test too. Timings are wall clock and
+depend on the machine; PAGE_BUDGET_TIME_FACTOR scales every ``max_ms`` (e.g.
+3 on a slow CI runner).
+
+    class PageBudgetTests(PageBudgetTestCase):
+        urlconf = 'dashboard.urls'
+        budgets = {'home': Budget(max_bytes=40_000)}
+"""
+
+import os
+import time
+import unittest
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+
+from utilities.synthetic import generate_households
+
+# generate_households() arguments for each dataset
+SIZES = {
+    'small': {'users': 2, 'meters_per_user': 1, 'years': 0.25},
+    'large': {'users': 6, 'meters_per_user': 3, 'years': 2.0},
+}
+
+
+def _time_factor():
+    return float(os.environ.get('PAGE_BUDGET_TIME_FACTOR', '1'))
+
+
+class Budget:
+    """
+    Limits for one URL. ``kwargs`` maps a Household to the URL's arguments;
+    ``status`` is the expected response status.
+    """
+
+    __slots__ = ('max_bytes', 'max_ms', 'status', 'kwargs')
+
+    def __init__(self, max_bytes, max_ms=500, status=200, kwargs=None):
+        self.max_bytes = max_bytes
+        self.max_ms = max_ms
+        self.status = status
+        self.kwargs = kwargs
+
+
+class Household:
+    """The requesting user of one dataset (an admin, so every page is reachable) and objects of theirs"""
+
+    def __init__(self, prefix):
+        from utilities.models import WaterMeter, WaterReading
+
+        User = get_user_model()
+        self.user = User.objects.get(username=f'{prefix}0000')
+        self.other_user = User.objects.get(username=f'{prefix}0001')
+        self.meter = WaterMeter.objects.filter(user=self.user).order_by('pk').first()
+        self.reading = WaterReading.objects.filter(meter__user=self.user).order_by('-timestamp').first()
+
+
+def named_urls(urlconf):
+    """Names of every URL in ``urlconf`` (including includes), without format-suffix duplicates"""
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name and 'format' not in pattern.pattern.converters:
+                yield pattern.name
+
+    return set(walk(import_module(urlconf).urlpatterns))
+
+
+class PageBudgetTestCase(TestCase):
+    urlconf = None
+    budgets = {}
+    # URL name -> why it cannot be measured here
+    excluded = {}
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.urlconf is None:
+            raise unittest.SkipTest('PageBudgetTestCase is a base class')
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Same clock for both sizes, so the "last 30 days" windows line up
+        now = timezone.now()
+        for size, options in SIZES.items():
+            generate_households(prefix=f'{size}-', seed=1, now=now, **options)
+            get_user_model().objects.filter(username=f'{size}-0000').update(role='admin')
+
+    def setUp(self):
+        self.namespace = getattr(import_module(self.urlconf), 'app_name', None)
+
+    def test_every_url_has_a_budget(self):
+        names = named_urls(self.urlconf)
+        self.assertEqual(set(), names - set(self.budgets) - set(self.excluded), 'URLs without a budget')
+        self.assertEqual(set(), (set(self.budgets) | set(self.excluded)) - names, 'Budgets for unknown URLs')
+
+    def test_page_budgets(self):
+        households = {size: Household(f'{size}-') for size in SIZES}
+        for name, budget in sorted(self.budgets.items()):
+            with self.subTest(url=name):
+                results = {size: self.measure(name, budget, household) for size, household in households.items()}
+                small, large = results['small'], results['large']
+
+                self.assertEqual(
+                    small['queries'], large['queries'],
+                    f"{name}: query count grows with data ({small['queries']} -> {large['queries']})\n"
+                    + '\n'.join(large['sql']),
+                )
+                self.assertLessEqual(
+                    large['bytes'], budget.max_bytes,
+                    f"{name}: response of {large['bytes']} bytes is over budget",
+                )
+                self.assertLessEqual(
+                    large['ms'], budget.max_ms * _time_factor(),
+                    f"{name}: response took {large['ms']:.0f}ms, over budget",
+                )
+
+    def measure(self, name, budget, household):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(household.user)
+        url = reverse(
+            f'{self.namespace}:{name}' if self.namespace else name,
+            kwargs=budget.kwargs(household) if budget.kwargs else None,
+        )
+
+        # One request to load templates and other per-process state, then measure a cold cache
+        client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+        self.assertEqual(response.status_code, budget.status, f'{name}: unexpected status')
+
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return {
+            'queries': len(captured),
+            'sql': [query['sql'] for query in captured.captured_queries],
+            'bytes': size,
+            'ms': elapsed,
+        }
@@ -0,0 +1,361 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from config import warmup
+from config.caching import cache_per_user, get_or_compute, invalidate_user_cache, user_cache_version
+from config.db_pool.pool import ConnectionPool
+from config.db_routers import REPLICA_ALIAS, STICKY_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, use_replica
+from utilities.models import WaterReading
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'config-tests'}}
+
+
+def _with_replica():
+    """A second SQLite alias next to ``default``, as if DB_REPLICA_HOST were set"""
+    replica = {**connections.databases['default'], 'NAME': ':memory:'}
+    return mock.patch.dict(connections.databases, {REPLICA_ALIAS: replica})
+
+
+def _routed_view(request):
+    # QuerySet.db asks the routers without running a query
+    return HttpResponse(f'{WaterReading.objects.all().db} {get_user_model().objects.all().db}')
+
+
+@override_settings(DATABASE_REPLICA_APPS=['utilities'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_reads_go_to_replica_only_inside_use_replica(self):
+        with _with_replica():
+            self.assertEqual(WaterReading.objects.all().db, 'default')
+            response = use_replica(_routed_view)(self.factory.get('/'))
+        # Models outside DATABASE_REPLICA_APPS stay on the primary
+        self.assertEqual(response.content.decode(), 'replica default')
+
+    def test_without_replica_reads_use_default(self):
+        response = use_replica(_routed_view)(self.factory.get('/'))
+        self.assertEqual(response.content.decode(), 'default default')
+
+    def test_writes_and_unsafe_methods_use_default(self):
+        with _with_replica():
+            response = use_replica(_routed_view)(self.factory.post('/'))
+            self.assertEqual(ReplicaRouter().db_for_write(WaterReading), 'default')
+        self.assertEqual(response.content.decode(), 'default default')
+
+    def test_pinned_client_reads_from_default(self):
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = str(2 ** 40)
+        with _with_replica():
+            response = use_replica(_routed_view)(request)
+        self.assertEqual(response.content.decode(), 'default default')
+
+    def test_expired_or_bad_pin_is_ignored(self):
+        for value in ('1', 'not a number'):
+            request = self.factory.get('/')
+            request.COOKIES[STICKY_COOKIE] = value
+            with _with_replica():
+                response = use_replica(_routed_view)(request)
+            self.assertEqual(response.content.decode(), 'replica default', value)
+
+    def test_async_view_routes_orm_calls_made_through_sync_to_async(self):
+        @use_replica
+        async def view(request):
+            return await sync_to_async(_routed_view)(request)
+
+        with _with_replica():
+            response = asyncio.run(view(self.factory.get('/')))
+            self.assertEqual(WaterReading.objects.all().db, 'default')
+        self.assertEqual(response.content.decode(), 'replica default')
+
+    def test_async_view_pinned_client_reads_from_default(self):
+        @use_replica
+        async def view(request):
+            return await sync_to_async(_routed_view)(request)
+
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = str(2 ** 40)
+        with _with_replica():
+            response = asyncio.run(view(request))
+        self.assertEqual(response.content.decode(), 'default default')
+
+    def test_only_default_is_migrated(self):
+        router = ReplicaRouter()
+        self.assertTrue(router.allow_migrate('default', 'utilities'))
+        self.assertFalse(router.allow_migrate(REPLICA_ALIAS, 'utilities'))
+        self.assertFalse(router.allow_migrate(REPLICA_ALIAS, 'accounts', model_name='customuser'))
+
+
+@override_settings(REPLICA_STICKY_SECONDS=15)
+class ReplicaStickinessMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = ReplicaStickinessMiddleware(lambda request: HttpResponse())
+
+    def test_write_pins_client(self):
+        with _with_replica():
+            response = self.middleware(self.factory.post('/'))
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 15)
+        self.assertTrue(cookie['httponly'])
+
+        # The next read from that client stays on the primary
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = cookie.value
+        with _with_replica():
+            routed = use_replica(_routed_view)(request)
+        self.assertEqual(routed.content.decode(), 'default default')
+
+    def test_reads_do_not_pin(self):
+        with _with_replica():
+            response = self.middleware(self.factory.get('/'))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_no_pin_without_replica(self):
+        response = self.middleware(self.factory.post('/'))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class _FakeConnection:
+    def __init__(self, check=None):
+        self.check = check
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        if self.check:
+            self.check()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_health_check_runs_without_the_pool_lock(self):
+        pool = ConnectionPool(lambda: (_FakeConnection(), None), max_size=2, health_check_interval=0)
+        lock_free = []
+
+        def take_lock():
+            acquired = pool._cond.acquire(timeout=1)
+            if acquired:
+                pool._cond.release()
+            lock_free.append(acquired)
+
+        def check():
+            # Another thread (e.g. one releasing a connection) can take the lock meanwhile
+            thread = threading.Thread(target=take_lock)
+            thread.start()
+            thread.join()
+
+        conn, created_at, extra = pool.acquire()
+        conn.check = check
+        pool.release(conn, created_at, extra)
+        self.assertIs(pool.acquire()[0], conn)
+        self.assertEqual(lock_free, [True])
+
+    def test_failed_health_check_discards_and_reconnects(self):
+        def fail():
+            raise OSError('server closed the connection')
+
+        pool = ConnectionPool(lambda: (_FakeConnection(), None), max_size=1, health_check_interval=0)
+        broken, created_at, extra = pool.acquire()
+        broken.check = fail
+        pool.release(broken, created_at, extra)
+
+        conn = pool.acquire()[0]
+        self.assertIsNot(conn, broken)
+        self.assertTrue(broken.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['created'], stats['discarded']), (1, 2, 1))
+
+
+@override_settings(CACHES=LOCMEM)
+class UserCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice', password='x')
+        cls.bob = get_user_model().objects.create_user('bob', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = []
+
+        @cache_per_user(60)
+        def view(request):
+            self.calls.append(request.user.username)
+            return HttpResponse(f'{request.user.username} {len(self.calls)}')
+
+        self.view = view
+
+    def get(self, user, path='/page/'):
+        request = self.factory.get(path)
+        request.user = user
+        return self.view(request).content.decode()
+
+    def test_version_bumps_only_on_commit(self):
+        version = user_cache_version(self.alice.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_cache(self.alice.pk)
+            self.assertEqual(user_cache_version(self.alice.pk), version)
+        self.assertEqual(user_cache_version(self.alice.pk), version + 1)
+
+    def test_rolled_back_write_does_not_bump(self):
+        version = user_cache_version(self.alice.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    invalidate_user_cache(self.alice.pk)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(user_cache_version(self.alice.pk), version)
+
+    def test_evicted_version_restarts_from_the_clock(self):
+        clock = mock.Mock(time=mock.Mock(side_effect=range(1000, 2000)))
+        with mock.patch('config.caching.time', clock):
+            first = user_cache_version(self.alice.pk)
+            cache.delete(f'cache:user_version:{self.alice.pk}')
+            self.assertGreater(user_cache_version(self.alice.pk), first)
+
+    def test_cache_per_user_hits_and_misses_per_user(self):
+        self.assertEqual(self.get(self.alice), 'alice 1')
+        self.assertEqual(self.get(self.alice), 'alice 1')
+        self.assertEqual(self.get(self.bob), 'bob 2')
+        self.assertEqual(self.get(self.alice, '/page/?month=2'), 'alice 3')
+        self.assertEqual(self.calls, ['alice', 'bob', 'alice'])
+
+    def test_invalidation_drops_only_that_users_pages(self):
+        self.get(self.alice)
+        self.get(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_cache(self.alice.pk)
+        self.assertEqual(self.get(self.alice), 'alice 3')
+        self.assertEqual(self.get(self.bob), 'bob 2')
+
+    def test_unsafe_and_anonymous_requests_are_not_cached(self):
+        request = self.factory.post('/page/')
+        request.user = self.alice
+        self.view(request)
+        self.view(request)
+        self.assertEqual(self.get(AnonymousUser()), ' 3')
+        self.assertEqual(self.get(AnonymousUser()), ' 4')
+
+
+@override_settings(CACHES=LOCMEM)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def test_miss_then_hit(self):
+        self.assertEqual(get_or_compute('k', self.compute, 60), 'value 1')
+        self.assertEqual(get_or_compute('k', self.compute, 60), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_recomputed_by_lock_winner(self):
+        cache.set('k', ('old', 0), 60)
+        self.assertEqual(get_or_compute('k', self.compute, 60), 'value 1')
+        self.assertEqual(get_or_compute('k', self.compute, 60), 'value 1')
+
+    def test_stale_value_served_while_another_caller_recomputes(self):
+        cache.set('k', ('old', 0), 60)
+        cache.add('k:lock', 1)
+        self.assertEqual(get_or_compute('k', self.compute, 60), 'old')
+        self.assertEqual(self.calls, 0)
+
+    def test_cold_miss_waits_for_the_winner(self):
+        cache.add('k:lock', 1)
+        winner = threading.Timer(0.2, lambda: cache.set('k', ('fresh', 2 ** 40), 60))
+        winner.start()
+        try:
+            self.assertEqual(get_or_compute('k', self.compute, 60), 'fresh')
+        finally:
+            winner.join()
+        self.assertEqual(self.calls, 0)
+
+    @mock.patch('config.caching.STALE_WAIT', 0.1)
+    def test_cold_miss_computes_when_winner_never_finishes(self):
+        cache.add('k:lock', 1)
+        self.assertEqual(get_or_compute('k', self.compute, 60), 'value 1')
+        # Not cached: the lock holder will store its own value
+        self.assertIsNone(cache.get('k'))
+
+
+@override_settings(DB_POOL='persistent')
+class WarmupTests(SimpleTestCase):
+    def warm_up(self, conn_max_age):
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': conn_max_age}), \
+                mock.patch.object(connection, 'ensure_connection') as ensure_connection, \
+                mock.patch.object(connection, 'close') as close:
+            warmup._open_database_connections(1)
+        ensure_connection.assert_called_once_with()
+        return close
+
+    def test_persistent_connection_stays_open_for_the_first_request(self):
+        self.warm_up(60).assert_not_called()
+
+    def test_connection_closed_without_persistence(self):
+        self.warm_up(0).assert_called_once_with()
+
+
+@override_settings(METRICS_TOKEN='scrape-me')
+class MetricsAuthTests(TestCase):
+    def test_scraper_with_token(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_wrong_or_missing_token_needs_a_login(self):
+        for headers in ({'HTTP_AUTHORIZATION': 'Bearer nope'}, {}):
+            self.assertEqual(self.client.get(reverse('metrics'), **headers).status_code, 302)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_is_never_accepted(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 302)
+
+    def test_admin_session(self):
+        admin = get_user_model().objects.create_user('boss', password='x', role='admin')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class LazyImportTests(SimpleTestCase):
+    def test_views_load_without_numpy(self):
+        # A fresh interpreter, since this one may already have numpy loaded
+        code = (
+            'import sys, django; django.setup(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns; '
+            'sys.exit("numpy" in sys.modules)'
+        )
+        result = subprocess.run([sys.executable, '-c', code], env=os.environ.copy(), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
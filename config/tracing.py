@@ -0,0 +1,304 @@
+"""
+Lightweight span tracing that speaks OpenTelemetry's wire format.
+
+Spans carry W3C trace/span IDs, continue an incoming ``traceparent`` header,
+and are exported as OTLP/JSON ``ExportTraceServiceRequest`` documents:
+
+- ``TRACING_EXPORTER=file`` appends one document per trace to TRACING_FILE
+  (JSON lines; replay into a collector or inspect with jq)
+- ``TRACING_EXPORTER=otlp`` POSTs to an OTLP/HTTP collector at
+  TRACING_OTLP_ENDPOINT (e.g. the OpenTelemetry Collector or Jaeger, port 4318)
+
+Export happens on a background thread once a trace's root span ends, so
+requests never wait on disk or network. With no exporter configured, spans
+are no-ops. TraceContextFilter adds ``trace_id``/``span_id`` to log records
+so log lines can be matched to traces.
+
+    @trace_view('upload_reading')
+    def view(request):
+        with span('upload.file_write', {'file.size': size}) as s:
+            ...
+            s.set_attribute('file.path', path)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+EXPORT_QUEUE_SIZE = 1000
+
+_current_span = ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'span_id', 'parent_span_id', 'kind', 'attributes', 'events',
+                 'start_ns', 'end_ns', 'status')
+
+    def __init__(self, trace, name, parent_span_id, kind, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc):
+        self.status = (STATUS_ERROR, str(exc))
+        self.events.append(('exception', time.time_ns(), {
+            'exception.type': type(exc).__name__,
+            'exception.message': str(exc),
+        }))
+
+    def to_otlp(self):
+        data = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': _otlp_attributes(self.attributes),
+        }
+        if self.parent_span_id:
+            data['parentSpanId'] = self.parent_span_id
+        if self.events:
+            data['events'] = [
+                {'name': name, 'timeUnixNano': str(at), 'attributes': _otlp_attributes(attributes)}
+                for name, at, attributes in self.events
+            ]
+        if self.status:
+            data['status'] = {'code': self.status[0], 'message': self.status[1]}
+        else:
+            data['status'] = {'code': STATUS_OK}
+        return data
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """Finished spans of one trace in this process, exported together when the local root ends"""
+
+    __slots__ = ('trace_id', 'spans')
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _parse_traceparent(header):
+    """Return ``(trace_id, parent_span_id)`` from a W3C traceparent header, or ``(None, None)``"""
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    try:
+        int(trace_id, 16), int(span_id, 16)
+    except ValueError:
+        return None, None
+    if trace_id == '0' * 32 or span_id == '0' * 16:
+        return None, None
+    return trace_id, span_id
+
+
+def tracing_enabled():
+    return bool(getattr(settings, 'TRACING_EXPORTER', ''))
+
+
+def current_span():
+    return _current_span.get() or _NOOP_SPAN
+
+
+@contextmanager
+def span(name, attributes=None, kind=SPAN_KIND_INTERNAL, traceparent=None):
+    """
+    Time the enclosed block as a child of the current span. Outside any span
+    this starts a new trace, continuing ``traceparent`` when one is given.
+    """
+    if not tracing_enabled():
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    if parent is not None:
+        trace, parent_span_id = parent.trace, parent.span_id
+    else:
+        trace_id, parent_span_id = _parse_traceparent(traceparent)
+        trace = _Trace(trace_id or secrets.token_hex(16))
+
+    current = Span(trace, name, parent_span_id, kind, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_exception(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        trace.spans.append(current)
+        if parent is None:
+            exporter.submit(trace.spans)
+
+
+def trace_view(name):
+    """Decorator: run a view (sync or async) inside a server span, linked to the caller's traceparent"""
+    def start(request, user_id):
+        return span(name, {
+            'http.method': request.method,
+            'http.target': request.path,
+            'enduser.id': user_id,
+        }, kind=SPAN_KIND_SERVER, traceparent=request.headers.get('traceparent'))
+
+    def finish(current, response):
+        current.set_attribute('http.status_code', response.status_code)
+        if current.trace_id:
+            response['X-Trace-Id'] = current.trace_id
+        return response
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                # Reading request.user may hit the database
+                user_id = await sync_to_async(lambda: request.user.pk)()
+                with start(request, user_id) as current:
+                    return finish(current, await view_func(request, *args, **kwargs))
+
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            with start(request, request.user.pk) as current:
+                return finish(current, view_func(request, *args, **kwargs))
+
+        return _wrapped_view
+    return decorator
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds ``trace_id`` and ``span_id`` ('-' outside a trace) to every log record"""
+
+    def filter(self, record):
+        current = _current_span.get()
+        record.trace_id = current.trace_id if current is not None else '-'
+        record.span_id = current.span_id if current is not None else '-'
+        return True
+
+
+class _Exporter:
+    """Background thread that writes finished traces to a file or an OTLP/HTTP collector"""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, spans):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            # A forked worker inherits the object but not the thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            try:
+                self.export(spans)
+            except Exception:
+                logger.exception('Trace export failed')
+
+    def export(self, spans):
+        body = json.dumps(self.document(spans), separators=(',', ':'))
+        if settings.TRACING_EXPORTER == 'otlp':
+            request = urllib.request.Request(
+                settings.TRACING_OTLP_ENDPOINT, data=body.encode(), method='POST',
+                headers={'Content-Type': 'application/json'},
+            )
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+        else:
+            os.makedirs(os.path.dirname(settings.TRACING_FILE) or '.', exist_ok=True)
+            with open(settings.TRACING_FILE, 'a') as f:
+                f.write(body + '\n')
+
+    @staticmethod
+    def document(spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({
+                'service.name': settings.TRACING_SERVICE_NAME,
+                'process.pid': os.getpid(),
+            })},
+            'scopeSpans': [{
+                'scope': {'name': 'homehub'},
+                'spans': [s.to_otlp() for s in spans],
+            }],
+        }]}
+
+
+exporter = _Exporter()
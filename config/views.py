@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+from accounts.decorators import admin_required
+from . import metrics as metrics_registry
+from .db_pool import pool_stats
+
+
+@admin_required
+def db_pool_stats(request):
+    """Connection pool counters for this worker process (wait time, reuse, size)"""
+    return JsonResponse({
+        'mode': settings.DB_POOL,
+        'pools': pool_stats(),
+    })
+
+
+def _render_metrics(request):
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+_admin_metrics = admin_required(_render_metrics)
+
+
+def _scrape_authorized(request):
+    # Prometheus can't log in, so scrapers send `Authorization: Bearer <METRICS_TOKEN>`
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def metrics(request):
+    """
+    Request, SQL, cache, OCR and pool metrics for this worker process, in
+    Prometheus text format. Open to scrapers with the METRICS_TOKEN bearer
+    token and to logged-in admins.
+    """
+    if _scrape_authorized(request):
+        return _render_metrics(request)
+    return _admin_metrics(request)
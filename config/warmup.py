@@ -0,0 +1,85 @@
+"""
+Warm-up for server processes, run from the gunicorn hooks in config/gunicorn.py.
+
+``warm_up_process()`` does work that needs no sockets (imports, URLconf,
+compiled templates) and runs once in the gunicorn master when the app is
+preloaded, so every forked worker shares the result copy-on-write.
+``warm_up_worker()`` runs in each worker before it accepts requests and opens
+the connections a worker needs (database, cache). Readiness only reports OK
+once a worker has been through it.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+_warm = False
+_lock = threading.Lock()
+
+
+def warm_up_process():
+    # Resolve the URLconf, which imports every view module
+    get_resolver().url_patterns
+    # Imported lazily by utilities.services to keep manage.py fast, but every server needs it
+    import google.generativeai  # noqa: F401
+    # Likewise numpy, which utilities.views and utilities.series import on first use
+    import numpy  # noqa: F401
+    _compile_templates()
+
+
+def warm_up_worker(db_connections=1):
+    """Open database and cache connections; idempotent, safe to call from any worker"""
+    global _warm
+    with _lock:
+        if _warm:
+            return
+        _open_database_connections(db_connections)
+        cache.get('warmup')
+        _warm = True
+
+
+def _compile_templates():
+    """Load every project template so the cached loader holds it (a no-op when DEBUG disables caching)"""
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for path in Path(directory).rglob('*.html'):
+            try:
+                get_template(path.relative_to(directory).as_posix())
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                logger.exception('Template %s failed to load during warm-up', path)
+
+
+def _open_database_connections(count):
+    if settings.DB_POOL == 'pool':
+        count = min(count, settings.DATABASES['default']['POOL']['MAX_SIZE'])
+    if settings.DB_POOL != 'pool' or count <= 1:
+        connection.ensure_connection()
+        if not connection.settings_dict['CONN_MAX_AGE']:
+            # Without persistent connections a kept one would just sit idle; with the pool, close() returns it
+            connection.close()
+        # A persistent connection stays open for the first request (sync workers serve from this thread)
+        return
+
+    # Hold ``count`` connections at once so the pool ends up with that many idle ones
+    barrier = threading.Barrier(count)
+
+    def open_one():
+        # ``connection`` resolves to this thread's own connection
+        connection.ensure_connection()
+        try:
+            barrier.wait(timeout=30)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        for future in [executor.submit(open_one) for _ in range(count)]:
+            future.result()
@@ -1,3 +1,8 @@
-from django.test import TestCase
+from config.testing import Budget, PageBudgetTestCase
 
-# Create your tests here.
+
+class PageBudgetTests(PageBudgetTestCase):
+    urlconf = 'dashboard.urls'
+    budgets = {
+        'home': Budget(max_bytes=30_000),
+    }
@@ -6,9 +6,11 @@ from datetime import datetime, timedelta
 import json
 
 from utilities.models import WaterMeter, WaterReading, WaterUsage
+from config.db_routers import use_replica
 
 
 @login_required
+@use_replica
 def dashboard_home(request):
     user_meters = WaterMeter.objects.filter(user=request.user, is_active=True)
     
@@ -22,28 +24,18 @@ def dashboard_home(request):
     # Recent readings
     recent_readings = WaterReading.objects.filter(
         meter__user=request.user
-    ).order_by('-timestamp')[:5]
+    ).select_related('meter').order_by('-timestamp')[:5]
     
-    # Monthly usage summary
-    current_month = timezone.now().replace(day=1)
+    # Monthly usage summary, read from each meter's denormalized snapshot
     monthly_data = {}
     
     for meter in user_meters:
-        readings = WaterReading.objects.filter(
-            meter=meter,
-            processed=True,
-            timestamp__gte=current_month
-        ).order_by('timestamp')
-        
-        if readings.count() >= 2:
-            first_reading = readings.first()
-            last_reading = readings.last()
-            usage = float(last_reading.reading_value - first_reading.reading_value)
-            
+        usage = meter.current_month_usage
+        if usage is not None:
             monthly_data[meter.name] = {
-                'usage': usage,
-                'cost': usage * float(meter.cost_per_unit),
-                'readings_count': readings.count()
+                'usage': float(usage),
+                'cost': float(meter.current_month_cost),
+                'readings_count': meter.month_reading_count
             }
     
     context = {
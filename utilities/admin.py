@@ -1,32 +1,140 @@
-from django.contrib import admin
-from .models import WaterMeter, WaterReading, WaterUsage, CostPrediction
+import io
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .forms import ReadingImportForm
+from .importer import ReadingImportError, ReadingImporter, detect_format, read_rows
+from .models import ArchivedReading, WaterMeter, WaterReading, WaterUsage, CostPrediction
+from .ocr_queue import ocr_queue, request_ocr
+from .pagination import EstimatedCountPaginator
+from .reprocess import select_reading_ids
+
+# Row errors listed after an admin import; the rest are only counted
+IMPORT_ERRORS_SHOWN = 10
 
 
 @admin.register(WaterMeter)
 class WaterMeterAdmin(admin.ModelAdmin):
     list_display = ['name', 'meter_type', 'user', 'is_active', 'created_at']
     list_filter = ['meter_type', 'is_active', 'created_at']
+    list_select_related = ['user']
+    ordering = ['name', 'pk']
     search_fields = ['name', 'user__username']
+    autocomplete_fields = ['user']
+    actions = ['reprocess_readings']
+
+    def delete_queryset(self, request, queryset):
+        # "Delete selected" would otherwise skip the sync tombstones and cache bumps of WaterMeter.delete()
+        queryset.delete_tracked()
+
+    @admin.action(description='Re-run OCR on unprocessed and negative-usage readings', permissions=['change'])
+    def reprocess_readings(self, request, queryset):
+        marked = request_ocr(select_reading_ids(queryset))
+        transaction.on_commit(ocr_queue.kick)
+        messages.success(request, f'Queued {marked} readings for OCR; their values update as they are read.')
 
 
 @admin.register(WaterReading)
 class WaterReadingAdmin(admin.ModelAdmin):
     list_display = ['meter', 'timestamp', 'reading_value', 'processed']
-    list_filter = ['processed', 'meter__meter_type', 'timestamp']
+    list_filter = ['processed', 'meter__meter_type']
+    list_select_related = ['meter']
+    date_hierarchy = 'timestamp'
     search_fields = ['meter__name']
+    autocomplete_fields = ['meter']
     readonly_fields = ['created_at']
+    # Readings are the largest table: no exact COUNT(*) of the whole table per page view
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['rerun_ocr']
+    change_list_template = 'admin/utilities/waterreading/change_list.html'
+
+    def delete_queryset(self, request, queryset):
+        # "Delete selected" would otherwise leave meter snapshots, series blocks and sync clients stale
+        queryset.delete_tracked()
+
+    @admin.action(description='Re-run OCR on selected readings', permissions=['change'])
+    def rerun_ocr(self, request, queryset):
+        # Marked in one UPDATE and worked through by a background thread; the marks survive restarts
+        marked = request_ocr(queryset)
+        transaction.on_commit(ocr_queue.kick)
+        messages.success(request, f'Queued {marked} readings for OCR; their values update as they are read.')
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='utilities_waterreading_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ReadingImportForm(request.POST or None, request.FILES or None, admin_site=self.admin_site)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            importer = ReadingImporter(user=form.cleaned_data['user'], dry_run=form.cleaned_data['dry_run'])
+            # Read the upload (in memory or a temporary file) as a text stream, row by row
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                result = importer.run(read_rows(stream, form.cleaned_data['format'] or detect_format(upload.name)))
+            except (ReadingImportError, UnicodeDecodeError) as exc:
+                messages.error(request, f'Import failed: {exc}')
+            else:
+                prefix = 'Dry run: ' if form.cleaned_data['dry_run'] else ''
+                messages.success(request, prefix + result.summary())
+                for line, message in result.errors[:IMPORT_ERRORS_SHOWN]:
+                    messages.warning(request, f'Line {line}: {message}')
+            finally:
+                stream.close()
+            return redirect('admin:utilities_waterreading_changelist')
+
+        return TemplateResponse(request, 'admin/utilities/waterreading/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import readings',
+        })
+
+
+@admin.register(ArchivedReading)
+class ArchivedReadingAdmin(admin.ModelAdmin):
+    """Read-only: rows only arrive here through `manage.py apply_retention`"""
+    list_display = ['meter', 'timestamp', 'reading_value', 'processed', 'archived_at']
+    list_filter = ['processed', 'meter__meter_type']
+    list_select_related = ['meter']
+    search_fields = ['meter__name']
+    # Retention only ever adds rows here
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(WaterUsage)
 class WaterUsageAdmin(admin.ModelAdmin):
     list_display = ['meter', 'date', 'usage_amount', 'calculated_cost']
-    list_filter = ['meter__meter_type', 'date']
+    list_filter = ['meter__meter_type']
+    list_select_related = ['meter']
+    date_hierarchy = 'date'
     search_fields = ['meter__name']
+    autocomplete_fields = ['meter']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(CostPrediction)
 class CostPredictionAdmin(admin.ModelAdmin):
     list_display = ['meter', 'prediction_date', 'predicted_usage', 'predicted_cost', 'confidence_score']
     list_filter = ['meter__meter_type', 'prediction_date']
+    list_select_related = ['meter']
     search_fields = ['meter__name']
+    autocomplete_fields = ['meter']
     readonly_fields = ['created_at']
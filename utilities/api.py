@@ -0,0 +1,213 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import RolePermission
+
+from .models import WaterMeter, WaterReading, SyncTombstone
+from .serializers import WaterMeterSerializer, WaterReadingSerializer, WaterReadingBulkSerializer
+
+BULK_MAX_ITEMS = 1000
+
+SYNC_PAGE_SIZE = 1000
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+
+class ReadingCursorPagination(CursorPagination):
+    ordering = ('-timestamp', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class MeterCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class WaterMeterViewSet(viewsets.ModelViewSet):
+    serializer_class = WaterMeterSerializer
+    pagination_class = MeterCursorPagination
+    permission_classes = [RolePermission]
+
+    def get_queryset(self):
+        return WaterMeter.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class WaterReadingViewSet(viewsets.ModelViewSet):
+    """
+    Readings of the current user's meters, newest first.
+
+    Supports ``?meter=<id>``, ``?processed=true|false`` and sparse fields via
+    ``?fields=``. ``POST``/``PATCH`` to ``bulk/`` create or update up to
+    BULK_MAX_ITEMS readings in one transaction.
+    """
+    serializer_class = WaterReadingSerializer
+    pagination_class = ReadingCursorPagination
+    permission_classes = [RolePermission]
+
+    def get_queryset(self):
+        queryset = WaterReading.objects.filter(meter__user=self.request.user).select_related('meter')
+        meter_id = self.request.query_params.get('meter')
+        if meter_id:
+            if not meter_id.isdigit():
+                raise ValidationError({'meter': 'Must be an integer.'})
+            queryset = queryset.filter(meter_id=int(meter_id))
+        processed = self.request.query_params.get('processed')
+        if processed in ('true', 'false'):
+            queryset = queryset.filter(processed=processed == 'true')
+        return queryset
+
+    def _bulk_payload(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError('Expected a list of readings.')
+        if len(request.data) > BULK_MAX_ITEMS:
+            raise ValidationError(f'At most {BULK_MAX_ITEMS} readings per request.')
+        return request.data
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk', permission_classes=[RolePermission])
+    def bulk(self, request):
+        payload = self._bulk_payload(request)
+        if request.method == 'POST':
+            serializer = WaterReadingBulkSerializer(data=payload, many=True, context=self.get_serializer_context())
+            response_status = status.HTTP_201_CREATED
+        else:
+            ids = [item.get('id') for item in payload if isinstance(item, dict)]
+            instances = list(self.get_queryset().filter(pk__in=ids))
+            serializer = WaterReadingBulkSerializer(
+                instances, data=payload, many=True, partial=True, context=self.get_serializer_context()
+            )
+            response_status = status.HTTP_200_OK
+
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError('A reading already exists for one of these meters at the same timestamp.')
+        return Response(serializer.data, status=response_status)
+
+
+class SyncView(APIView):
+    """
+    Delta sync for offline clients.
+
+    ``GET ?since=<token>`` returns meters and readings changed after the token
+    plus tombstones for deleted ones, and a ``next_token`` to send next time.
+    Meters and readings come in (updated_at, id) order, SYNC_PAGE_SIZE of each
+    at a time; keep calling with ``next_token`` while ``has_more`` is true.
+    ``reset: true`` means the token predates retained tombstones and the client
+    must discard local data and sync from scratch.
+
+    ``updated_at`` is set when a row is saved, not when its transaction
+    commits, so once caught up the token steps back SYNC_SAFETY_SECONDS to
+    pick up rows committed late. Records changed within that window are sent
+    again, so clients should upsert by id; a write whose transaction takes
+    longer than the window to commit can be missed until the record changes
+    again.
+    """
+    permission_classes = [RolePermission]
+
+    def get(self, request):
+        now = timezone.now()
+        try:
+            since, after_id, meters_since, after_meter_id = decode_sync_token(request.query_params.get('since'))
+        except ValueError:
+            raise ValidationError({'since': 'Invalid sync token.'})
+
+        reset = since is not None and since < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+        if reset or since is None:
+            since, after_id = datetime.min.replace(tzinfo=dt_timezone.utc), 0
+            meters_since, after_meter_id = since, 0
+
+        readings = _changed_page(
+            WaterReading.objects.filter(meter__user=request.user).select_related('meter'), since, after_id,
+        )
+        meters = _changed_page(WaterMeter.objects.filter(user=request.user), meters_since, after_meter_id)
+        readings_more = len(readings) > SYNC_PAGE_SIZE
+        meters_more = len(meters) > SYNC_PAGE_SIZE
+        readings, meters = readings[:SYNC_PAGE_SIZE], meters[:SYNC_PAGE_SIZE]
+
+        deleted = {SyncTombstone.METER: [], SyncTombstone.READING: []}
+        if not reset:
+            tombstones = SyncTombstone.objects.filter(user=request.user, deleted_at__gt=since)
+            for kind, object_id in tombstones.values_list('kind', 'object_id'):
+                deleted[kind].append(object_id)
+
+        has_more = readings_more or meters_more
+        if has_more:
+            # Page on from the last row sent; a stream that is done stays put until the other one is too
+            if readings:
+                since, after_id = readings[-1].updated_at, readings[-1].pk
+            if meters:
+                meters_since, after_meter_id = meters[-1].updated_at, meters[-1].pk
+        else:
+            # Step back so rows committed late by concurrent writers are not skipped
+            since = meters_since = now - timedelta(seconds=settings.SYNC_SAFETY_SECONDS)
+            after_id = after_meter_id = 0
+
+        context = {'request': request}
+        return Response({
+            'reset': reset,
+            'meters': WaterMeterSerializer(meters, many=True, context=context).data,
+            'readings': WaterReadingSerializer(readings, many=True, context=context).data,
+            'deleted': {
+                'meters': deleted[SyncTombstone.METER],
+                'readings': deleted[SyncTombstone.READING],
+            },
+            'next_token': encode_sync_token(since, after_id, meters_since, after_meter_id),
+            'has_more': has_more,
+        })
+
+
+def _changed_page(queryset, since, after_id):
+    """Up to SYNC_PAGE_SIZE + 1 rows after the (updated_at, id) cursor, so the caller can tell if there are more"""
+    queryset = queryset.filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=after_id))
+    return list(queryset.order_by('updated_at', 'id')[:SYNC_PAGE_SIZE + 1])
+
+
+def encode_sync_token(moment, last_id, meters_moment=None, last_meter_id=0):
+    meters_moment = meters_moment or moment
+    payload = json.dumps(
+        [moment.isoformat(), last_id, meters_moment.isoformat(), last_meter_id], separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_sync_token(token):
+    """
+    Return ``(datetime, last_id, meters_datetime, last_meter_id)``: the
+    reading and meter cursors, or ``(None, 0, None, 0)`` for a first sync.
+    Raise ValueError if malformed. Tokens from before meters were paged hold
+    only the reading cursor, which then applies to meters too.
+    """
+    if not token:
+        return None, 0, None, 0
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if len(cursor) == 2:
+            cursor = [*cursor, cursor[0], 0]
+        moment, last_id, meters_moment, last_meter_id = cursor
+        moment, meters_moment = datetime.fromisoformat(moment), datetime.fromisoformat(meters_moment)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(token) from e
+    if timezone.is_naive(moment) or timezone.is_naive(meters_moment):
+        raise ValueError(token)
+    return moment, int(last_id), meters_moment, int(last_meter_id)
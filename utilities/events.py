@@ -0,0 +1,107 @@
+"""
+Reading status events for Server-Sent Events streams.
+
+Each ASGI process runs one background task that polls for readings changed
+since its last pass (a single indexed query on ``updated_at`` for all
+connected users) and fans the changes out to per-connection asyncio queues.
+Idle connections therefore cost a queue and a coroutine, not a thread or a
+database query each.
+
+``updated_at`` is set when a reading is saved, not when its transaction
+commits, so like the sync API each pass looks back SAFETY_SECONDS from the
+newest change seen and skips changes it has already pushed.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .models import WaterReading
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+QUEUE_SIZE = 100
+SAFETY_SECONDS = 30
+
+
+class ReadingEventBroker:
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = defaultdict(set)  # user_id -> {asyncio.Queue}
+        self._task = None
+        self._last_seen = None
+        self._sent = set()  # (id, updated_at) of changes newer than _last_seen already pushed
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        if self._task is None or self._task.done():
+            self._last_seen = timezone.now()
+            self._sent = set()
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled client misses events; it resyncs on reconnect
+                pass
+
+    async def _poll(self):
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                rows = await self._fetch_changes(list(self._subscribers), self._last_seen)
+            except Exception:
+                logger.exception('Failed to poll reading changes')
+                continue
+            self._dispatch(rows)
+
+    def _dispatch(self, rows):
+        """Publish the changes not pushed yet, then move the watermark SAFETY_SECONDS before the newest"""
+        for row in rows:
+            key = (row['id'], row['updated_at'])
+            if key in self._sent:
+                continue
+            self._sent.add(key)
+            self.publish(row['meter__user_id'], self._event(row))
+        if rows:
+            self._last_seen = max(self._last_seen, rows[-1]['updated_at'] - timedelta(seconds=SAFETY_SECONDS))
+            self._sent = {key for key in self._sent if key[1] > self._last_seen}
+
+    @staticmethod
+    def _event(row):
+        return {
+            'id': row['id'],
+            'meter': row['meter_id'],
+            'processed': row['processed'],
+            'reading_value': str(row['reading_value']) if row['reading_value'] is not None else None,
+            'updated_at': row['updated_at'].isoformat(),
+        }
+
+    @staticmethod
+    @sync_to_async
+    def _fetch_changes(user_ids, since):
+        return list(
+            WaterReading.objects.filter(meter__user_id__in=user_ids, updated_at__gt=since)
+            .order_by('updated_at', 'id')
+            .values('id', 'meter_id', 'meter__user_id', 'reading_value', 'processed', 'updated_at')
+        )
+
+
+broker = ReadingEventBroker()
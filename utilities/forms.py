@@ -1,6 +1,7 @@
 from django import forms
 from .models import WaterReading, WaterMeter
 from django.utils import timezone
+from datetime import datetime, time, timedelta
 
 
 class WaterReadingUploadForm(forms.ModelForm):
@@ -96,4 +97,83 @@ class WaterMeterForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['cost_per_unit'].label = "Cost per Liter"
-        self.fields['cost_per_unit'].help_text = "Cost in your local currency per liter"
\ No newline at end of file
+        self.fields['cost_per_unit'].help_text = "Cost in your local currency per liter"
+
+
+class ReadingFilterForm(forms.Form):
+    PROCESSED_CHOICES = [
+        ('', 'All statuses'),
+        ('1', 'Processed'),
+        ('0', 'Pending'),
+    ]
+
+    meter = forms.ModelChoiceField(
+        queryset=WaterMeter.objects.none(),
+        required=False,
+        empty_label='All meters',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    date_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-control-sm'}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-control-sm'}),
+    )
+    processed = forms.ChoiceField(
+        choices=PROCESSED_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user:
+            self.fields['meter'].queryset = WaterMeter.objects.filter(user=user)
+
+    def filter_queryset(self, queryset):
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data.get('meter'):
+            queryset = queryset.filter(meter=data['meter'])
+        # Compare against aware datetime bounds rather than ``timestamp__date``
+        # so the (timestamp, id) index can still serve the range scan
+        if data.get('date_from'):
+            start = datetime.combine(data['date_from'], time.min)
+            queryset = queryset.filter(timestamp__gte=timezone.make_aware(start))
+        if data.get('date_to'):
+            end = datetime.combine(data['date_to'] + timedelta(days=1), time.min)
+            queryset = queryset.filter(timestamp__lt=timezone.make_aware(end))
+        if data.get('processed') in ('0', '1'):
+            queryset = queryset.filter(processed=data['processed'] == '1')
+        return queryset
+
+
+class ReadingImportForm(forms.Form):
+    """Admin upload for utilities.importer"""
+    file = forms.FileField(help_text='CSV or JSON lines with meter, timestamp, value and optional image and notes columns')
+    format = forms.ChoiceField(
+        choices=[('', 'Detect from file name'), ('csv', 'CSV'), ('jsonl', 'JSON lines')],
+        required=False,
+    )
+    user = forms.ModelChoiceField(
+        queryset=None,
+        required=False,
+        help_text='Owner of the meters; lets the meter column hold meter names instead of ids',
+    )
+    dry_run = forms.BooleanField(required=False, help_text='Only validate the file')
+
+    def __init__(self, *args, admin_site=None, **kwargs):
+        from django.contrib.auth import get_user_model
+
+        super().__init__(*args, **kwargs)
+        if admin_site is not None:
+            # Search users as you type instead of listing every one
+            from django.contrib.admin.widgets import AutocompleteSelect
+
+            self.fields['user'].widget = AutocompleteSelect(WaterMeter._meta.get_field('user'), admin_site)
+        # Setting the queryset also hands the choices to the widget
+        self.fields['user'].queryset = get_user_model().objects.order_by('username')
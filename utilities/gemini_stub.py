@@ -0,0 +1,128 @@
+"""
+Local HTTP stand-in for the Gemini ``generateContent`` REST endpoint.
+
+Start it, then point the app at it with ``GEMINI_API_ENDPOINT`` (which
+switches the SDK to its REST transport):
+
+    stub = GeminiStub(latency=0.8, error_rate=0.05, responses=['1234.567', 'UNCLEAR'])
+    stub.start()
+    # GEMINI_API_ENDPOINT=stub.url
+    ...
+    stub.stop()
+
+Every call sleeps ``latency`` seconds (plus up to ``jitter``), then either
+fails with HTTP ``error_status`` (with probability ``error_rate``) or
+answers with the next text from ``responses``. Requests are served on
+their own threads, so concurrent calls overlap the way they do against
+the real API.
+
+The SDK gives up on 500 and 429 at once but retries 503 with backoff for up
+to a minute, so ``error_status=503`` shows what an outage does to uploads.
+"""
+
+import itertools
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# How Google APIs label HTTP errors
+GRPC_STATUS = {
+    HTTPStatus.TOO_MANY_REQUESTS: 'RESOURCE_EXHAUSTED',
+    HTTPStatus.INTERNAL_SERVER_ERROR: 'INTERNAL',
+    HTTPStatus.SERVICE_UNAVAILABLE: 'UNAVAILABLE',
+    HTTPStatus.GATEWAY_TIMEOUT: 'DEADLINE_EXCEEDED',
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        stub = self.server.stub
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if ':generateContent' not in self.path:
+            self._send(404, {'error': {'code': 404, 'message': f'Unknown method {self.path}', 'status': 'NOT_FOUND'}})
+            return
+
+        time.sleep(stub.latency + (stub.rng.uniform(0, stub.jitter) if stub.jitter else 0))
+        text, fail = stub.next_outcome()
+        if fail:
+            self._send(stub.error_status, {'error': {
+                'code': stub.error_status, 'message': 'Injected by GeminiStub',
+                'status': GRPC_STATUS.get(stub.error_status, 'UNKNOWN'),
+            }})
+            return
+        self._send(200, {
+            'candidates': [{
+                'content': {'parts': [{'text': text}], 'role': 'model'},
+                'finishReason': 'STOP',
+                'index': 0,
+            }],
+        })
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GeminiStub:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.5, jitter=0.0, error_rate=0.0,
+                 error_status=500, responses=('123.456',), seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self._responses = itertools.cycle(responses)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def next_outcome(self):
+        """Return ``(text, fail)`` for the next call and count it"""
+        with self._lock:
+            self.calls += 1
+            if self.rng.random() < self.error_rate:
+                self.errors += 1
+                return None, True
+            return next(self._responses), False
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='gemini-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,193 @@
+"""
+Bulk import of readings from CSV or JSON lines.
+
+Each row (CSV header names or JSON keys) has:
+
+- ``meter``: meter id, or meter name when importing for one user
+- ``timestamp``: ISO 8601; times without an offset are in TIME_ZONE
+- ``value``: the reading; empty leaves the reading unprocessed
+- ``image``: optional path of an existing file, relative to MEDIA_ROOT
+- ``notes``: optional
+
+The file is read as a stream and written IMPORT_BATCH_SIZE rows at a time,
+each batch as one ``INSERT ... ON CONFLICT (meter, timestamp) DO UPDATE``,
+so importing the same file again updates readings in place. Empty optional
+columns leave the existing image and notes alone. Meter snapshots (and with
+them per-user caches) are rebuilt once per meter at the end, not per row.
+"""
+
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from pathlib import PurePosixPath
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import WaterMeter, WaterReading
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 100
+FORMATS = ('csv', 'jsonl')
+MAX_READING_VALUE = Decimal('9999999.999')  # max_digits=10, decimal_places=3
+# Written on every upsert; image and notes only when the row has them
+UPDATE_FIELDS = ['reading_value', 'processed', 'updated_at']
+OPTIONAL_FIELDS = ('image', 'notes')
+
+
+class ReadingImportError(ValueError):
+    pass
+
+
+class ImportResult:
+    __slots__ = ('rows', 'imported', 'duplicates', 'errors', 'meter_ids')
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0  # rows repeating a (meter, timestamp) of the same batch; the last one wins
+        self.errors = []  # (line, message)
+        self.meter_ids = set()
+
+    def summary(self):
+        return (
+            f'{self.rows} rows: {self.imported} readings imported into {len(self.meter_ids)} meters, '
+            f'{self.duplicates} duplicates, {len(self.errors)} errors'
+        )
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` from a text stream"""
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, exc
+                continue
+            yield line_number, row if isinstance(row, dict) else ValueError('expected a JSON object')
+    elif fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        raise ReadingImportError(f"Unknown format '{fmt}'; expected one of {', '.join(FORMATS)}")
+
+
+class ReadingImporter:
+    """Upsert readings from rows; with ``user``, meters may be named and must belong to that user"""
+
+    def __init__(self, user=None, batch_size=IMPORT_BATCH_SIZE, max_errors=IMPORT_MAX_ERRORS, dry_run=False):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.dry_run = dry_run
+        meters = WaterMeter.objects.all() if user is None else WaterMeter.objects.filter(user=user)
+        self.meters = {}
+        for meter_id, name in meters.values_list('id', 'name'):
+            self.meters[str(meter_id)] = meter_id
+            if user is not None:
+                self.meters.setdefault(name, meter_id)
+
+    def run(self, rows, progress=None):
+        result = ImportResult()
+        batch = {}
+        try:
+            for line_number, row in rows:
+                result.rows += 1
+                try:
+                    reading = self._parse(row)
+                except ValueError as exc:
+                    result.errors.append((line_number, str(exc)))
+                    if len(result.errors) > self.max_errors:
+                        first_line, first_message = result.errors[0]
+                        raise ReadingImportError(
+                            f'Stopped after {self.max_errors} errors (first on line {first_line}: {first_message})'
+                        )
+                    continue
+                key = (reading.meter_id, reading.timestamp)
+                if key in batch:
+                    result.duplicates += 1
+                batch[key] = reading
+                if len(batch) >= self.batch_size:
+                    self._write(batch, result)
+                    batch = {}
+                    if progress:
+                        progress(result)
+            self._write(batch, result)
+        finally:
+            # Also after a failure, so snapshots match the batches that made it in
+            if not self.dry_run:
+                for meter in WaterMeter.objects.filter(pk__in=result.meter_ids):
+                    meter.refresh_snapshot()
+        return result
+
+    def _parse(self, row):
+        if isinstance(row, Exception):
+            raise ValueError(str(row))
+        row = {key.strip().lower(): ('' if value is None else str(value).strip()) for key, value in row.items() if key}
+
+        meter_id = self.meters.get(row.get('meter', ''))
+        if meter_id is None:
+            raise ValueError(f"unknown meter '{row.get('meter', '')}'")
+
+        timestamp = parse_datetime(row.get('timestamp', ''))
+        if timestamp is None:
+            raise ValueError(f"invalid timestamp '{row.get('timestamp', '')}'")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+
+        value = None
+        if row.get('value'):
+            try:
+                value = Decimal(row['value'])
+            except InvalidOperation:
+                raise ValueError(f"invalid value '{row['value']}'")
+            if not value.is_finite() or not 0 <= value <= MAX_READING_VALUE:
+                raise ValueError(f"value '{row['value']}' out of range")
+            value = value.quantize(Decimal('0.001'))
+
+        image = row.get('image', '')
+        if image:
+            # Never let a row point a reading at a file outside the media storage
+            path = PurePosixPath(image)
+            if path.is_absolute() or '\\' in image or '..' in path.parts:
+                raise ValueError(f"image '{image}' must be a path inside the media storage")
+            if not default_storage.exists(image):
+                raise ValueError(f"image '{image}' does not exist")
+
+        return WaterReading(
+            meter_id=meter_id, timestamp=timestamp, reading_value=value, processed=value is not None,
+            image=image, notes=row.get('notes', ''),
+        )
+
+    def _write(self, batch, result):
+        if not batch:
+            return
+        # ON CONFLICT updates the same columns for every row of a statement,
+        # so rows are grouped by which optional columns they fill in
+        groups = {}
+        for reading in batch.values():
+            present = tuple(field for field in OPTIONAL_FIELDS if getattr(reading, field))
+            groups.setdefault(present, []).append(reading)
+        if not self.dry_run:
+            with transaction.atomic():
+                for present, readings in groups.items():
+                    WaterReading.objects.bulk_create(
+                        readings,
+                        update_conflicts=True,
+                        unique_fields=['meter', 'timestamp'],
+                        update_fields=UPDATE_FIELDS + list(present),
+                    )
+        result.imported += len(batch)
+        result.meter_ids.update(meter_id for meter_id, _ in batch)
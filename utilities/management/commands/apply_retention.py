@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.models import WaterMeter
+from utilities.retention import RETENTION_BATCH_SIZE, RetentionPolicy
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact old raw readings to the last reading of each day (then of each month) and move the rest '
+        'to the archive table. Usage totals between the kept readings stay exact.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--daily-after', type=int, default=settings.RETENTION_DAILY_AFTER_DAYS,
+            help='Keep one reading per day for readings older than this many days',
+        )
+        parser.add_argument(
+            '--monthly-after', type=int, default=settings.RETENTION_MONTHLY_AFTER_DAYS,
+            help='Keep one reading per month for readings older than this many days',
+        )
+        parser.add_argument('--user', help='Only compact the meters of this user')
+        parser.add_argument('--meter', type=int, action='append', dest='meters', help='Only compact this meter id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=RETENTION_BATCH_SIZE, help='Readings archived per transaction')
+        parser.add_argument('--delete-images', action='store_true', help='Also delete the image files of archived readings')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived without changing anything')
+
+    def handle(self, *args, **options):
+        meters = WaterMeter.objects.all()
+        if options['user']:
+            try:
+                meters = meters.filter(user=get_user_model().objects.get(username=options['user']))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named '{options['user']}'")
+        if options['meters']:
+            meters = meters.filter(pk__in=options['meters'])
+
+        try:
+            policy = RetentionPolicy(
+                daily_after=options['daily_after'], monthly_after=options['monthly_after'],
+                batch_size=options['batch_size'], delete_images=options['delete_images'], dry_run=options['dry_run'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        def progress(meter, result):
+            self.stdout.write(f'{meter.pk} {meter.name}: {result.archived} archived so far')
+
+        result = policy.run(meters, progress=progress if options['verbosity'] > 1 else None)
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(prefix + result.summary()))
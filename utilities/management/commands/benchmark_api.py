@@ -0,0 +1,112 @@
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure REST API throughput (requests per second for one worker process) '
+        'against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readings', type=int, default=10000, help='Readings to seed before measuring')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds to run each scenario')
+        parser.add_argument('--bulk-size', type=int, default=100, help='Readings per bulk create request')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            results = self._run(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<24} {result['requests_per_second']:>9.1f} req/s "
+                f"{result['mean_ms']:>8.2f} ms mean ({result['requests']} requests)"
+            )
+
+    def _run(self, options):
+        from accounts.models import CustomUser
+        from utilities.models import WaterMeter, WaterReading
+
+        user = CustomUser.objects.create_user('benchmark', password='benchmark', role='reader')
+        meter = WaterMeter.objects.create(name='Benchmark', meter_type='cold', user=user)
+        start = timezone.now() - timedelta(hours=options['readings'])
+        WaterReading.objects.bulk_create(
+            [
+                WaterReading(
+                    meter=meter,
+                    timestamp=start + timedelta(hours=i),
+                    reading_value=Decimal(i) / 10,
+                    processed=True,
+                )
+                for i in range(options['readings'])
+            ],
+            batch_size=1000,
+        )
+        meter.refresh_snapshot()
+
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        bulk_offset = [0]
+
+        def bulk_payload():
+            base = timezone.now() + timedelta(days=1)
+            items = []
+            for _ in range(options['bulk_size']):
+                bulk_offset[0] += 1
+                items.append({
+                    'meter': meter.pk,
+                    'timestamp': (base + timedelta(seconds=bulk_offset[0])).isoformat(),
+                    'reading_value': '1.000',
+                    'processed': True,
+                })
+            return json.dumps(items)
+
+        scenarios = {
+            'readings_list': lambda: client.get('/utilities/api/readings/'),
+            'readings_list_sparse': lambda: client.get('/utilities/api/readings/?fields=timestamp,reading_value'),
+            'readings_list_deep': lambda: client.get(
+                f'/utilities/api/readings/?meter={meter.pk}&processed=true&page_size=500'
+            ),
+            'meters_list': lambda: client.get('/utilities/api/meters/'),
+            'readings_bulk_create': lambda: client.post(
+                '/utilities/api/readings/bulk/', bulk_payload(), content_type='application/json'
+            ),
+        }
+
+        results = {'readings': options['readings'], 'scenarios': {}}
+        for name, call in scenarios.items():
+            response = call()
+            if response.status_code >= 400:
+                raise RuntimeError(f'{name} returned HTTP {response.status_code}')
+            count = 0
+            began = time.perf_counter()
+            deadline = began + options['duration']
+            while time.perf_counter() < deadline:
+                call()
+                count += 1
+            elapsed = time.perf_counter() - began
+            results['scenarios'][name] = {
+                'requests': count,
+                'seconds': elapsed,
+                'requests_per_second': count / elapsed,
+                'mean_ms': elapsed / count * 1000 if count else 0.0,
+            }
+        return results
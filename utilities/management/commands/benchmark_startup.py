@@ -0,0 +1,85 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Each scenario runs in a fresh interpreter, so every import is paid again
+SCENARIOS = {
+    'manage_check': [sys.executable, 'manage.py', 'check'],
+    'wsgi_load': [sys.executable, '-c', 'from config.wsgi import application'],
+    # What a worker pays before answering its first request: app load plus the URLconf and every view module
+    'wsgi_first_request': [
+        sys.executable, '-c',
+        'from config.wsgi import application\n'
+        'from django.urls import get_resolver\n'
+        'get_resolver().url_patterns',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold-start time of `manage.py check` and of loading the WSGI application, '
+        'each in a fresh interpreter, and list the slowest imports.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Runs per scenario; the median is reported')
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+
+        results = {'python': sys.version.split()[0], 'runs': options['runs'], 'scenarios': {}}
+        for name, command in SCENARIOS.items():
+            # One untimed run so the OS file cache is warm and the .pyc files exist
+            self._run(command, env)
+            timings = [self._run(command, env) for _ in range(options['runs'])]
+            results['scenarios'][name] = {
+                'median_seconds': statistics.median(timings),
+                'min_seconds': min(timings),
+                'max_seconds': max(timings),
+            }
+        results['slowest_imports'] = self._slowest_imports(SCENARIOS['wsgi_first_request'], env, options['top'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<20} {result['median_seconds'] * 1000:>8.0f} ms median "
+                f"({result['min_seconds'] * 1000:.0f}-{result['max_seconds'] * 1000:.0f} ms)"
+            )
+        self.stdout.write('Slowest top-level imports (wsgi_first_request):')
+        for item in results['slowest_imports']:
+            self.stdout.write(f"  {item['cumulative_ms']:>8.1f} ms  {item['module']}")
+
+    @staticmethod
+    def _run(command, env):
+        began = time.perf_counter()
+        subprocess.run(command, cwd=settings.BASE_DIR, env=env, check=True, capture_output=True)
+        return time.perf_counter() - began
+
+    @staticmethod
+    def _slowest_imports(command, env, top):
+        """Parse ``python -X importtime`` output for the costliest imports made directly by our code"""
+        completed = subprocess.run(
+            [command[0], '-X', 'importtime', *command[1:]],
+            cwd=settings.BASE_DIR, env=env, check=True, capture_output=True, text=True,
+        )
+        imports = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, module = line[len('import time:'):].split('|')
+            # Nested imports are indented; top-level ones are what removing an import statement saves
+            if module.startswith(' ') and not module.startswith('  '):
+                imports.append({'module': module.strip(), 'cumulative_ms': int(cumulative) / 1000})
+        imports.sort(key=lambda item: item['cumulative_ms'], reverse=True)
+        return imports[:top]
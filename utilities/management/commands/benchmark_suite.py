@@ -0,0 +1,230 @@
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from utilities.synthetic import fake_ocr, generate_households
+
+# name: (users, meters per user, years of history)
+SIZES = {
+    'small': (5, 2, 1.0),
+    'medium': (20, 3, 3.0),
+    'large': (50, 4, 5.0),
+}
+SCENARIOS = ('dashboard_home', 'readings_list', 'usage_analytics', 'api_usage_data', 'upload_reading')
+
+
+def _git_revision():
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return completed.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the main pages (dashboard, readings list, analytics, usage API and upload) at several '
+        'data sizes against a throwaway test database, with Gemini replaced by a stub, and write the '
+        'results as JSON so runs on different commits can be compared.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='small,medium',
+            help=f"Comma-separated data sizes ({', '.join(SIZES)})",
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per scenario')
+        parser.add_argument('--readings-per-week', type=float, default=3.0, help='Average readings per meter per week')
+        parser.add_argument('--ocr-latency', type=float, default=0.0, help='Simulated Gemini latency in seconds')
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Keep the cache between iterations (default: clear it so every request does the full work)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Where to write the JSON results (default: benchmark-results/<timestamp>-<revision>.json)',
+        )
+        parser.add_argument('--baseline', help='Earlier results file to compare against')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Median slowdown versus the baseline that counts as a regression (0.2 = 20%%)',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Exit with an error if any scenario regressed beyond --threshold',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = [size for size in sizes if size not in SIZES]
+        if unknown:
+            raise CommandError(f"Unknown size(s): {', '.join(unknown)}; choose from {', '.join(SIZES)}")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        revision = _git_revision()
+        results = {
+            'revision': revision,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'warm_cache': options['warm_cache'],
+            'ocr_latency': options['ocr_latency'],
+            'sizes': {},
+        }
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                    fake_ocr(latency=options['ocr_latency']):
+                for size in sizes:
+                    call_command('flush', interactive=False, verbosity=0)
+                    cache.clear()
+                    results['sizes'][size] = self._run_size(size, options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        output = options['output'] or os.path.join(
+            'benchmark-results', f"{datetime.now():%Y%m%d-%H%M%S}-{revision}.json"
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        self._report(results, baseline, options['threshold'])
+        self.stdout.write(f'Results written to {output}')
+
+        if baseline is not None and options['fail_on_regression']:
+            regressions = self._regressions(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError(f"{len(regressions)} scenario(s) regressed: {', '.join(regressions)}")
+
+    def _run_size(self, size, options):
+        users, meters_per_user, years = SIZES[size]
+        self.stdout.write(f'Generating {size}: {users} users x {meters_per_user} meters x {years:g} years...')
+        counts = generate_households(
+            users=users, meters_per_user=meters_per_user, years=years,
+            readings_per_week=options['readings_per_week'], prefix=f'bench-{size}-',
+        )
+
+        from accounts.models import CustomUser
+        from utilities.models import WaterMeter
+
+        # Every household has the same shape; time the requests of the first one
+        user = CustomUser.objects.get(username=f'bench-{size}-0000')
+        meter = WaterMeter.objects.filter(user=user).first()
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, 'JPEG')
+        image_bytes = buffer.getvalue()
+
+        requests = {
+            'dashboard_home': lambda: client.get(reverse('dashboard:home')),
+            'readings_list': lambda: client.get(reverse('utilities:readings_list')),
+            'usage_analytics': lambda: client.get(reverse('utilities:usage_analytics')),
+            'api_usage_data': lambda: client.get(reverse('utilities:api_usage_data')),
+            'upload_reading': lambda: client.post(reverse('utilities:upload_reading'), {
+                'meter': meter.pk,
+                'image': SimpleUploadedFile('meter.jpg', image_bytes, 'image/jpeg'),
+            }),
+        }
+
+        scenarios = {}
+        for name in SCENARIOS:
+            call = requests[name]
+            # One untimed request to load templates and fill the cache for --warm-cache
+            response = call()
+            if response.status_code >= 400:
+                raise CommandError(f'{name} returned HTTP {response.status_code} at size {size}')
+
+            timings, queries = [], []
+            for _ in range(options['iterations']):
+                if not options['warm_cache']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    began = time.perf_counter()
+                    response = call()
+                    timings.append((time.perf_counter() - began) * 1000)
+                queries.append(len(captured))
+            scenarios[name] = {
+                'median_ms': statistics.median(timings),
+                'p95_ms': _percentile(timings, 0.95),
+                'mean_ms': statistics.fmean(timings),
+                'min_ms': min(timings),
+                'queries': max(queries),
+                'response_bytes': len(response.content),
+            }
+        return {'data': counts, 'scenarios': scenarios}
+
+    @staticmethod
+    def _regressions(results, baseline, threshold):
+        regressions = []
+        for size, data in results['sizes'].items():
+            previous = baseline.get('sizes', {}).get(size, {}).get('scenarios', {})
+            for name, result in data['scenarios'].items():
+                before = previous.get(name)
+                if before and result['median_ms'] > before['median_ms'] * (1 + threshold):
+                    regressions.append(f'{size}/{name}')
+        return regressions
+
+    def _report(self, results, baseline, threshold):
+        regressions = set(self._regressions(results, baseline, threshold)) if baseline else set()
+        for size, data in results['sizes'].items():
+            counts = data['data']
+            self.stdout.write(
+                f"\n{size}: {counts['users']} users, {counts['meters']} meters, {counts['readings']} readings"
+            )
+            previous = (baseline or {}).get('sizes', {}).get(size, {}).get('scenarios', {})
+            for name, result in data['scenarios'].items():
+                line = (
+                    f"  {name:<18} {result['median_ms']:>8.2f} ms median {result['p95_ms']:>8.2f} ms p95 "
+                    f"{result['queries']:>4} queries {result['response_bytes']:>8} bytes"
+                )
+                before = previous.get(name)
+                if before:
+                    change = result['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0.0
+                    line += f'  {change:+.0%} vs {baseline.get("revision", "baseline")}'
+                    if f'{size}/{name}' in regressions:
+                        line = self.style.ERROR(line + '  REGRESSION')
+                self.stdout.write(line)
@@ -0,0 +1,123 @@
+import asyncio
+import io
+import json
+import tempfile
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import include, path
+from PIL import Image
+
+from utilities import views
+from utilities.synthetic import fake_ocr
+
+# Both implementations side by side, whatever settings.ASYNC_VIEWS says
+urlpatterns = [
+    path('benchmark/upload/sync/', views.upload_reading),
+    path('benchmark/upload/async/', views.upload_reading_async),
+    path('', include('config.urls')),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare upload throughput of the sync and async upload views in one process, '
+        'with Gemini replaced by a stub that waits --ocr-latency seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=50, help='Uploads per implementation')
+        parser.add_argument('--concurrency', type=int, default=25, help='Concurrent uploads for the async path')
+        parser.add_argument('--ocr-latency', type=float, default=0.5, help='Simulated Gemini latency in seconds')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root, ROOT_URLCONF=__name__):
+                results = self._run(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name in ('sync', 'async'):
+            result = results[name]
+            self.stdout.write(
+                f"{name:<6} {result['uploads_per_second']:>8.2f} uploads/s "
+                f"({result['uploads']} uploads in {result['seconds']:.2f}s, {result['errors']} errors)"
+            )
+        self.stdout.write(f"speedup {results['speedup']:.1f}x")
+
+    def _run(self, options):
+        from accounts.models import CustomUser
+        from utilities.models import WaterMeter
+
+        user = CustomUser.objects.create_user('benchmark', password='benchmark', role='reader')
+        meter = WaterMeter.objects.create(name='Benchmark', meter_type='cold', user=user)
+        latency = options['ocr_latency']
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, 'JPEG')
+        image_bytes = buffer.getvalue()
+
+        def payload():
+            return {'meter': meter.pk, 'image': SimpleUploadedFile('meter.jpg', image_bytes, 'image/jpeg')}
+
+        client = Client()
+        client.force_login(user)
+        session_cookie = client.cookies.copy()
+
+        with fake_ocr(latency=latency):
+
+            # Sync path: one request at a time, as in a sync gunicorn worker
+            errors = 0
+            began = time.perf_counter()
+            for _ in range(options['uploads']):
+                if client.post('/benchmark/upload/sync/', payload()).status_code != 302:
+                    errors += 1
+            sync_seconds = time.perf_counter() - began
+
+            # Async path: many uploads in flight on one event loop
+            async def run_async():
+                semaphore = asyncio.Semaphore(options['concurrency'])
+                failures = 0
+
+                async def one():
+                    nonlocal failures
+                    async with semaphore:
+                        async_client = AsyncClient()
+                        async_client.cookies = session_cookie.copy()
+                        response = await async_client.post('/benchmark/upload/async/', payload())
+                        if response.status_code != 302:
+                            failures += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one() for _ in range(options['uploads'])))
+                return time.perf_counter() - started, failures
+
+            async_seconds, async_errors = asyncio.run(run_async())
+
+        results = {
+            'ocr_latency': latency,
+            'concurrency': options['concurrency'],
+            'sync': {
+                'uploads': options['uploads'], 'seconds': sync_seconds, 'errors': errors,
+                'uploads_per_second': options['uploads'] / sync_seconds,
+            },
+            'async': {
+                'uploads': options['uploads'], 'seconds': async_seconds, 'errors': async_errors,
+                'uploads_per_second': options['uploads'] / async_seconds,
+            },
+        }
+        results['speedup'] = results['async']['uploads_per_second'] / results['sync']['uploads_per_second']
+        return results
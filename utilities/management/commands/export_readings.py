@@ -0,0 +1,60 @@
+import sys
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from utilities.exporter import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_chunks, parquet_available
+from utilities.models import WaterReading
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a user's readings with computed usage and cost to CSV or Parquet, "
+        'a chunk at a time so memory stays flat for any amount of history.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username whose readings to export')
+        parser.add_argument('--meter', type=int, help='Only this meter id')
+        parser.add_argument('--since', help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', default='-', help="File to write, or '-' for stdout")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched and written at a time')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named '{options['user']}'")
+        if options['format'] == 'parquet' and not parquet_available():
+            raise CommandError('Parquet export needs the pyarrow package')
+
+        readings = WaterReading.objects.filter(meter__user=user)
+        if options['meter']:
+            readings = readings.filter(meter_id=options['meter'])
+        if options['since']:
+            readings = readings.filter(timestamp__gte=self._day_start(options['since']))
+        if options['until']:
+            readings = readings.filter(timestamp__lt=self._day_start(options['until']) + timedelta(days=1))
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in export_chunks(readings, options['format'], options['chunk_size']):
+                output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+    @staticmethod
+    def _day_start(value):
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError(f"Invalid date '{value}'; expected YYYY-MM-DD")
+        return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.synthetic import generate_households
+
+
+class Command(BaseCommand):
+    help = (
+        'Create synthetic households: reader accounts with meters and years of irregular, '
+        'seasonal readings (with rollovers, pending uploads and misreads), using bulk inserts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Reader accounts to create')
+        parser.add_argument('--meters-per-user', type=int, default=2, help='Meters per account')
+        parser.add_argument('--years', type=float, default=2.0, help='Years of reading history per meter')
+        parser.add_argument('--readings-per-week', type=float, default=3.0, help='Average readings per meter per week')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--prefix', default='household', help='Username prefix (<prefix>0000, <prefix>0001, ...)')
+        parser.add_argument('--password', default='household', help='Password for every created account')
+
+    def handle(self, *args, **options):
+        from accounts.models import CustomUser
+
+        if options['users'] < 1 or options['meters_per_user'] < 1:
+            raise CommandError('--users and --meters-per-user must be at least 1')
+        if options['readings_per_week'] <= 0 or options['years'] <= 0:
+            raise CommandError('--years and --readings-per-week must be positive')
+        if CustomUser.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users with prefix '{options['prefix']}' already exist; pick another --prefix")
+
+        def progress(done, meters, readings):
+            if done % 10 == 0 or done == meters:
+                self.stdout.write(f'{done}/{meters} meters, {readings} readings')
+
+        counts = generate_households(
+            users=options['users'],
+            meters_per_user=options['meters_per_user'],
+            years=options['years'],
+            readings_per_week=options['readings_per_week'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            progress=progress if options['verbosity'] > 0 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['meters']} meters and {counts['readings']} readings"
+        ))
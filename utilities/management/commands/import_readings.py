@@ -0,0 +1,58 @@
+import io
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.importer import (
+    FORMATS, IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS, ReadingImportError, ReadingImporter, detect_format, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Import readings from a CSV or JSON lines file (columns: meter, timestamp, value, image, notes) '
+        'in large batches, updating readings that already exist for the same meter and timestamp.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the file extension, else csv)')
+        parser.add_argument('--user', help='Username whose meters the rows refer to; allows meter names instead of ids')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per INSERT statement')
+        parser.add_argument('--max-errors', type=int, default=IMPORT_MAX_ERRORS, help='Invalid rows to skip before giving up')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without writing anything')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named '{options['user']}'")
+
+        fmt = options['format'] or detect_format(options['path'])
+        importer = ReadingImporter(
+            user=user, batch_size=options['batch_size'], max_errors=options['max_errors'], dry_run=options['dry_run'],
+        )
+
+        def progress(result):
+            self.stdout.write(f'{result.rows} rows read, {result.imported} imported')
+
+        if options['path'] == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+        else:
+            try:
+                stream = open(options['path'], encoding='utf-8-sig', newline='')
+            except OSError as exc:
+                raise CommandError(str(exc))
+        try:
+            with stream:
+                result = importer.run(read_rows(stream, fmt), progress=progress if options['verbosity'] > 1 else None)
+        except ReadingImportError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in result.errors:
+            self.stderr.write(f'line {line}: {message}')
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(prefix + result.summary()))
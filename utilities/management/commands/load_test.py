@@ -0,0 +1,292 @@
+import http.cookiejar
+import io
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.gemini_stub import GeminiStub
+from utilities.synthetic import generate_households
+
+USER_PREFIX = 'loadtest-'
+READY_TIMEOUT = 60
+REQUEST_TIMEOUT = 180
+
+# endpoint label -> path; reads are split evenly between these
+READ_ENDPOINTS = {
+    'usage_analytics': '/utilities/analytics/',
+    'api_usage_data': '/utilities/api/usage-data/',
+}
+UPLOAD_PATH = '/utilities/upload/'
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class _Session:
+    """A logged-in browser session: cookies, CSRF token, no redirect following"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def request(self, path, data=None, headers=None):
+        """Return the HTTP status; error statuses are results, not exceptions"""
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        try:
+            with self.opener.open(request, timeout=REQUEST_TIMEOUT) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+
+    def login(self, username, password):
+        self.request(settings.LOGIN_URL)
+        status = self.request(settings.LOGIN_URL, urllib.parse.urlencode({
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.csrf_token(),
+        }).encode(), {'Content-Type': 'application/x-www-form-urlencoded', 'Referer': self.base_url + settings.LOGIN_URL})
+        if status != 302:
+            raise CommandError(f'Logging in as {username} failed with HTTP {status}')
+
+    def post_multipart(self, path, fields, files):
+        boundary = uuid.uuid4().hex
+        body = io.BytesIO()
+        for name, value in {**fields, 'csrfmiddlewaretoken': self.csrf_token()}.items():
+            body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        for name, (filename, content, content_type) in files.items():
+            body.write(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: {content_type}\r\n\r\n'.encode()
+            )
+            body.write(content)
+            body.write(b'\r\n')
+        body.write(f'--{boundary}--\r\n'.encode())
+        return self.request(path, body.getvalue(), {
+            'Content-Type': f'multipart/form-data; boundary={boundary}',
+            'Referer': self.base_url + path,
+        })
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test uploads and analytics reads over HTTP with Gemini replaced by a local stub '
+        '(configurable latency, error rate and responses). Starts gunicorn with config/gunicorn.py '
+        'unless --target is given, and reports throughput, latency percentiles and error rates per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            help='Base URL of an already running app. It must use this database and be started with '
+                 'GEMINI_API_ENDPOINT set to the stub (see --stub-port).',
+        )
+        parser.add_argument('--port', type=int, default=8090, help='Port for the gunicorn started by this command')
+        parser.add_argument('--asgi', action='store_true', help='Start the ASGI (uvicorn) server and async views')
+        parser.add_argument('--concurrency', type=int, default=10, help='Simulated users sending requests at once')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+        parser.add_argument('--upload-share', type=float, default=0.3, help='Fraction of requests that are uploads')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the request mix and the stub')
+        parser.add_argument('--stub-port', type=int, default=0, help='Port for the Gemini stub (default: any free port)')
+        parser.add_argument('--ocr-latency', type=float, default=1.0, help='Stub Gemini latency in seconds')
+        parser.add_argument('--ocr-jitter', type=float, default=0.5, help='Extra random stub latency, up to this many seconds')
+        parser.add_argument('--ocr-error-rate', type=float, default=0.0, help='Fraction of Gemini calls that fail')
+        parser.add_argument(
+            '--ocr-error-status', type=int, default=500,
+            help='HTTP status of failed Gemini calls (the SDK retries 503 for up to a minute)',
+        )
+        parser.add_argument(
+            '--ocr-response', action='append', dest='ocr_responses',
+            help='Text the stub answers with, cycled in order (repeatable; e.g. 1234.567 or UNCLEAR)',
+        )
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        users = self._ensure_users(options['concurrency'])
+        stub = GeminiStub(
+            port=options['stub_port'], latency=options['ocr_latency'], jitter=options['ocr_jitter'],
+            error_rate=options['ocr_error_rate'], error_status=options['ocr_error_status'],
+            responses=options['ocr_responses'] or ['123.456'], seed=options['seed'],
+        )
+        stub.start()
+        server = None
+        try:
+            if options['target']:
+                base_url = options['target']
+                self.stderr.write(f'Gemini stub listening on {stub.url}; the target must use GEMINI_API_ENDPOINT={stub.url}')
+            else:
+                base_url = f"http://127.0.0.1:{options['port']}"
+                server = self._start_server(options, stub.url)
+                self._wait_ready(base_url, server)
+            results = self._run(base_url, users, options)
+        finally:
+            if server is not None:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+            stub.stop()
+
+        results['ocr_stub'] = {
+            'calls': stub.calls, 'errors': stub.errors,
+            'latency': options['ocr_latency'], 'jitter': options['ocr_jitter'],
+            'error_rate': options['ocr_error_rate'], 'error_status': options['ocr_error_status'],
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['concurrency']} users for {results['seconds']:.1f}s against {results['target']}"
+        )
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<16} {result['requests_per_second']:>7.2f} req/s  "
+                f"p50 {result['p50_ms']:>7.0f} ms  p95 {result['p95_ms']:>7.0f} ms  p99 {result['p99_ms']:>7.0f} ms  "
+                f"{result['errors']:>4} errors ({result['error_rate']:.1%}) of {result['requests']}"
+            )
+        self.stdout.write(f"Gemini stub: {stub.calls} calls, {stub.errors} injected errors")
+
+    def _ensure_users(self, count):
+        from accounts.models import CustomUser
+        from utilities.models import WaterMeter
+
+        if not CustomUser.objects.filter(username__startswith=USER_PREFIX).exists():
+            self.stderr.write(f'Creating {count} {USER_PREFIX}* users with a year of readings...')
+            generate_households(users=count, meters_per_user=2, years=1.0, prefix=USER_PREFIX, password='loadtest')
+        meters = {}
+        for username, meter_id in WaterMeter.objects.filter(
+            user__username__startswith=USER_PREFIX, is_active=True,
+        ).order_by('user__username', 'pk').values_list('user__username', 'id'):
+            meters.setdefault(username, []).append(meter_id)
+        return list(meters.items())
+
+    def _start_server(self, options, stub_url):
+        env = dict(os.environ)
+        env.update({
+            'GEMINI_API_ENDPOINT': stub_url,
+            'GEMINI_API_KEY': env.get('GEMINI_API_KEY') or 'load-test',
+            'GUNICORN_BIND': f"127.0.0.1:{options['port']}",
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+        })
+        if options['asgi']:
+            env.update({'GUNICORN_MODE': 'asgi', 'DJANGO_SERVER_INTERFACE': 'asgi'})
+            app = 'config.asgi:application'
+        else:
+            app = 'config.wsgi:application'
+        # Access log lines go to stdout; keep stderr for errors
+        return subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'config/gunicorn.py', app],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+
+    def _wait_ready(self, base_url, server):
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with code {server.returncode}')
+            try:
+                with urllib.request.urlopen(base_url + '/healthz/ready/', timeout=2) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise CommandError(f'{base_url} was not ready after {READY_TIMEOUT}s')
+
+    def _run(self, base_url, users, options):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), 'white').save(buffer, 'JPEG')
+        image_bytes = buffer.getvalue()
+
+        samples = []  # (endpoint, seconds, ok)
+        samples_lock = threading.Lock()
+        failures = []
+        started = time.perf_counter()
+        deadline = started + options['duration']
+
+        def simulate_user(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            username, meter_ids = users[index % len(users)]
+            session = _Session(base_url)
+            session.login(username, 'loadtest')
+            while time.perf_counter() < deadline:
+                if rng.random() < options['upload_share']:
+                    endpoint, expected = 'upload_reading', 302
+                    call = lambda: session.post_multipart(  # noqa: E731
+                        UPLOAD_PATH, {'meter': rng.choice(meter_ids)},
+                        {'image': ('meter.jpg', image_bytes, 'image/jpeg')},
+                    )
+                else:
+                    endpoint, expected = rng.choice(list(READ_ENDPOINTS)), 200
+                    call = lambda: session.request(READ_ENDPOINTS[endpoint])  # noqa: E731
+                began = time.perf_counter()
+                try:
+                    ok = call() == expected
+                except OSError:
+                    ok = False
+                elapsed = time.perf_counter() - began
+                with samples_lock:
+                    samples.append((endpoint, elapsed, ok))
+
+        def worker(index):
+            try:
+                simulate_user(index)
+            except Exception as exc:
+                failures.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if failures:
+            raise CommandError(f'{len(failures)} simulated user(s) failed: {failures[0]}')
+        seconds = time.perf_counter() - started
+
+        endpoints = {}
+        for name in ('upload_reading', *READ_ENDPOINTS):
+            timings = [elapsed * 1000 for endpoint, elapsed, _ in samples if endpoint == name]
+            if not timings:
+                continue
+            errors = sum(1 for endpoint, _, ok in samples if endpoint == name and not ok)
+            endpoints[name] = {
+                'requests': len(timings),
+                'errors': errors,
+                'error_rate': errors / len(timings),
+                'requests_per_second': len(timings) / seconds,
+                'mean_ms': statistics.fmean(timings),
+                'p50_ms': _percentile(timings, 0.50),
+                'p95_ms': _percentile(timings, 0.95),
+                'p99_ms': _percentile(timings, 0.99),
+            }
+        return {
+            'target': base_url,
+            'server': 'external' if options['target'] else ('asgi' if options['asgi'] else 'wsgi'),
+            'concurrency': options['concurrency'],
+            'seconds': seconds,
+            'upload_share': options['upload_share'],
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from utilities.api import SYNC_TOMBSTONE_RETENTION_DAYS
+from utilities.models import SyncTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the retention window; clients with older tokens get a full resync.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {cutoff:%Y-%m-%d}'))
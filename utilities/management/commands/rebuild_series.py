@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.models import WaterMeter
+from utilities.series import rebuild_blocks, series_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the packed per-meter-month reading series (ReadingBlock) from WaterReading. '
+        'Run after turning SERIES_STORE on, or after writing readings with it off.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meter', type=int, action='append', dest='meters', help='Only rebuild this meter id (repeatable)')
+
+    def handle(self, *args, **options):
+        if not series_enabled():
+            raise CommandError('SERIES_STORE is off; turn it on first so writes keep the blocks current')
+        meters = WaterMeter.objects.order_by('pk')
+        if options['meters']:
+            meters = meters.filter(pk__in=options['meters'])
+        count = 0
+        for meter_id in meters.values_list('pk', flat=True).iterator():
+            rebuild_blocks(meter_id)
+            count += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{meter_id}: rebuilt')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the series of {count} meters'))
@@ -0,0 +1,94 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.models import WaterMeter
+from utilities.reprocess import (
+    REPROCESS_CONCURRENCY, SELECTIONS, Checkpoint, ReprocessResult, Reprocessor, select_reading_ids,
+)
+
+DEFAULT_CHECKPOINT = 'reprocess-checkpoint.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-run OCR on unprocessed readings and/or readings lower than the one before them, several at a time. '
+        'Progress is checkpointed to a file; run the same command again to resume after an interruption.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--select', choices=SELECTIONS, default='both',
+            help='unprocessed uploads, negative-usage readings, both (default), or readings the admin marked for OCR',
+        )
+        parser.add_argument('--user', help='Only readings of this user')
+        parser.add_argument('--meter', type=int, action='append', dest='meters', help='Only this meter id (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=REPROCESS_CONCURRENCY, help='Gemini calls at a time')
+        parser.add_argument('--limit', type=int, help='Stop after this many readings (resume later)')
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='Checkpoint file')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over')
+        parser.add_argument('--progress-every', type=float, default=10.0, help='Seconds between progress lines')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the selected readings')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        meters = WaterMeter.objects.all()
+        if options['user']:
+            try:
+                meters = meters.filter(user=get_user_model().objects.get(username=options['user']))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named '{options['user']}'")
+        if options['meters']:
+            meters = meters.filter(pk__in=options['meters'])
+
+        # The same selection must be resumed, or "done up to id N" means nothing
+        scope = {'select': options['select'], 'user': options['user'], 'meters': sorted(options['meters'] or [])}
+        checkpoint = Checkpoint(options['checkpoint'])
+        saved = None if options['restart'] else checkpoint.load()
+        if saved is not None and saved.get('scope') != scope:
+            raise CommandError(
+                f"{options['checkpoint']} belongs to a run with {saved.get('scope')}; "
+                'repeat those options, pass --restart, or use another --checkpoint'
+            )
+
+        reading_ids = select_reading_ids(meters, options['select'])
+        result = ReprocessResult(**saved['result']) if saved else ReprocessResult()
+        remaining = sum(1 for pk in reading_ids if pk > result.last_id)
+        if saved:
+            self.stdout.write(f"Resuming after reading {result.last_id}: {result.summary()}")
+        result.total = result.done + remaining
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {remaining} readings to re-run OCR on'))
+            return
+
+        started, last_report = time.monotonic(), [time.monotonic()]
+        done_before = result.done
+
+        def progress(result):
+            now = time.monotonic()
+            if now - last_report[0] < options['progress_every']:
+                return
+            last_report[0] = now
+            rate = (result.done - done_before) / (now - started)
+            eta = (result.total - result.done) / rate if rate else 0
+            self.stdout.write(f'{result.summary()} ({rate:.1f}/s, about {eta:.0f}s left)')
+
+        def save(result):
+            checkpoint.save({'scope': scope, 'result': result.as_dict()})
+
+        try:
+            Reprocessor(concurrency=options['concurrency']).run(
+                reading_ids, result=result, checkpoint=save, progress=progress, limit=options['limit'],
+            )
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted: {result.summary()}. Run the command again to resume.")
+
+        if result.done < result.total:
+            self.stdout.write(self.style.SUCCESS(
+                f"Stopped at --limit: {result.summary()}. Run the command again to continue."
+            ))
+            return
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(f'Finished in {time.monotonic() - started:.1f}s: {result.summary()}'))
@@ -0,0 +1,42 @@
+import re
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.vendor import VENDOR_ASSETS
+
+# Source maps are not vendored; a dangling reference would make collectstatic fail
+SOURCE_MAP_RE = re.compile(rb'\n?/[*/]# sourceMappingURL=[^\s*]+(?: \*/)?\s*$')
+
+
+class Command(BaseCommand):
+    help = 'Download the pinned third-party CSS/JS/fonts into static/vendor/ so pages load without CDN requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download again even if the file already exists')
+        parser.add_argument('--timeout', type=int, default=60)
+
+    def handle(self, *args, **options):
+        root = Path(settings.STATICFILES_DIRS[0])
+        fetched = 0
+        for name, url in VENDOR_ASSETS.items():
+            target = root / name
+            if target.exists() and not options['force']:
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=options['timeout']) as response:
+                    content = response.read()
+            except OSError as e:
+                raise CommandError(f'Could not download {url}: {e}')
+            if name.endswith(('.css', '.js')):
+                content = SOURCE_MAP_RE.sub(b'\n', content)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            fetched += 1
+            self.stdout.write(f'{name} ({len(content) / 1024:.0f} KiB)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Vendored {fetched} file(s); {len(VENDOR_ASSETS) - fetched} already present'
+        ))
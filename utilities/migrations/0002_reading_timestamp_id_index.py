@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waterreading',
+            index=models.Index(fields=['-timestamp', '-id'], name='reading_timestamp_id_idx'),
+        ),
+    ]
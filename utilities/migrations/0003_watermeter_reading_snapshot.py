@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:50
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_snapshots(apps, schema_editor):
+    WaterMeter = apps.get_model('utilities', 'WaterMeter')
+    WaterReading = apps.get_model('utilities', 'WaterReading')
+    month_start = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    for meter in WaterMeter.objects.all().iterator():
+        readings = WaterReading.objects.filter(meter_id=meter.pk)
+        valued = readings.filter(processed=True, reading_value__isnull=False)
+        latest = valued.order_by('-timestamp').first()
+        month_readings = valued.filter(timestamp__gte=month_start)
+        month_first = month_readings.order_by('timestamp').first()
+
+        meter.reading_count = readings.count()
+        meter.latest_reading_value = latest.reading_value if latest else None
+        meter.latest_reading_at = latest.timestamp if latest else None
+        meter.month_start_reading_value = month_first.reading_value if month_first else None
+        meter.month_start_reading_at = month_first.timestamp if month_first else None
+        meter.month_reading_count = month_readings.count()
+        meter.save(update_fields=[
+            'reading_count', 'latest_reading_value', 'latest_reading_at',
+            'month_start_reading_value', 'month_start_reading_at', 'month_reading_count',
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilities', '0002_reading_timestamp_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watermeter',
+            name='latest_reading_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='watermeter',
+            name='latest_reading_value',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='watermeter',
+            name='month_reading_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='watermeter',
+            name='month_start_reading_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='watermeter',
+            name='month_start_reading_value',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='watermeter',
+            name='reading_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilities', '0004_sync_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('image', models.CharField(blank=True, max_length=100)),
+                ('reading_value', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('processed', models.BooleanField(default=False)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('meter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_readings', to='utilities.watermeter')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['meter', 'timestamp'], name='archived_meter_timestamp_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilities', '0005_archived_reading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month (UTC)')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('meter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_blocks', to='utilities.watermeter')),
+            ],
+            options={
+                'ordering': ['meter', 'month'],
+                'unique_together': {('meter', 'month')},
+            },
+        ),
+    ]
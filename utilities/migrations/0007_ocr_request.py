@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilities', '0006_reading_block'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waterreading',
+            name='ocr_requested_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='waterreading',
+            index=models.Index(condition=models.Q(('ocr_requested_at__isnull', False)), fields=['id'], name='reading_ocr_requested_idx'),
+        ),
+    ]
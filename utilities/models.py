@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import os
 
+from config.caching import invalidate_user_cache
+
 User = get_user_model()
 
 
@@ -10,6 +13,19 @@ def upload_water_image(instance, filename):
     return f'water_readings/{timezone.now().strftime("%Y/%m")}/{filename}'
 
 
+class WaterMeterQuerySet(models.QuerySet):
+    def delete_tracked(self):
+        """Bulk version of WaterMeter.delete(): a tombstone per meter and one cache bump per user"""
+        with transaction.atomic():
+            rows = list(self.values_list('pk', 'user_id'))
+            SyncTombstone.objects.bulk_create([
+                SyncTombstone(user_id=user_id, kind=SyncTombstone.METER, object_id=pk) for pk, user_id in rows
+            ])
+            for user_id in {user_id for _, user_id in rows}:
+                invalidate_user_cache(user_id)
+            return WaterMeter.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+
+
 class WaterMeter(models.Model):
     METER_TYPES = [
         ('hot', 'Hot Water'),
@@ -21,11 +37,127 @@ class WaterMeter(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     cost_per_unit = models.DecimalField(max_digits=8, decimal_places=4, default=0.0050, help_text="Cost per liter")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_active = models.BooleanField(default=True)
+
+    # Denormalized snapshot of the meter's readings, maintained by WaterReading.save()/delete() and delete_tracked()
+    reading_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_reading_value = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True, editable=False)
+    latest_reading_at = models.DateTimeField(null=True, blank=True, editable=False)
+    month_start_reading_value = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True, editable=False)
+    month_start_reading_at = models.DateTimeField(null=True, blank=True, editable=False)
+    month_reading_count = models.PositiveIntegerField(default=0, editable=False)
+    SNAPSHOT_FIELDS = (
+        'reading_count', 'latest_reading_value', 'latest_reading_at',
+        'month_start_reading_value', 'month_start_reading_at', 'month_reading_count',
+    )
+
+    objects = WaterMeterQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.name} - {self.get_meter_type_display()}"
 
+    @staticmethod
+    def current_month_start():
+        return timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def refresh_snapshot(self, count=True, months=None):
+        """
+        Recompute the denormalized reading snapshot from WaterReading.
+
+        Only a couple of LIMIT 1 lookups on the (meter, timestamp) index are
+        needed, so this stays cheap regardless of how many readings exist and
+        is correct for backfilled and deleted readings alike. Callers doing
+        bulk writes should call this once per meter afterwards.
+
+        With SERIES_STORE on, the meter's series blocks are rebuilt too: only
+        ``months`` (from ``series.month_of``) when given, otherwise all.
+        """
+        from .series import rebuild_blocks, series_enabled
+
+        with transaction.atomic():
+            # Serialize concurrent writers on the same meter
+            WaterMeter.objects.select_for_update().filter(pk=self.pk).exists()
+
+            valued = WaterReading.objects.filter(meter_id=self.pk, processed=True, reading_value__isnull=False)
+            latest = valued.order_by('-timestamp').values('reading_value', 'timestamp').first()
+            month_readings = valued.filter(timestamp__gte=self.current_month_start())
+            month_first = month_readings.order_by('timestamp').values('reading_value', 'timestamp').first()
+
+            self.latest_reading_value = latest['reading_value'] if latest else None
+            self.latest_reading_at = latest['timestamp'] if latest else None
+            self.month_start_reading_value = month_first['reading_value'] if month_first else None
+            self.month_start_reading_at = month_first['timestamp'] if month_first else None
+            self.month_reading_count = month_readings.count() if month_first else 0
+            update_fields = [
+                'latest_reading_value', 'latest_reading_at',
+                'month_start_reading_value', 'month_start_reading_at', 'month_reading_count',
+            ]
+            if count:
+                self.reading_count = WaterReading.objects.filter(meter_id=self.pk).count()
+                update_fields.append('reading_count')
+            # The snapshot is part of the synced meter, so mark the meter changed
+            self.updated_at = timezone.now()
+            update_fields.append('updated_at')
+            WaterMeter.objects.filter(pk=self.pk).update(**{f: getattr(self, f) for f in update_fields})
+            if series_enabled():
+                rebuild_blocks(self.pk, months)
+            # Every reading write passes through here, so this keeps per-user caches honest
+            invalidate_user_cache(self.user_id)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # The in-memory snapshot may be stale; only refresh_snapshot() writes it
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SNAPSHOT_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        invalidate_user_cache(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            SyncTombstone.objects.create(user_id=self.user_id, kind=SyncTombstone.METER, object_id=self.pk)
+            invalidate_user_cache(self.user_id)
+            return super().delete(*args, **kwargs)
+
+    @property
+    def snapshot_is_current_month(self):
+        return bool(self.month_start_reading_at and self.month_start_reading_at >= self.current_month_start())
+
+    @property
+    def current_month_usage(self):
+        """Usage since the first reading of this month, or None without two readings this month"""
+        if not self.snapshot_is_current_month or self.month_reading_count < 2:
+            return None
+        return self.latest_reading_value - self.month_start_reading_value
+
+    @property
+    def current_month_cost(self):
+        usage = self.current_month_usage
+        if usage is None:
+            return None
+        return usage * self.cost_per_unit
+
+
+class WaterReadingQuerySet(models.QuerySet):
+    def delete_tracked(self):
+        """
+        Delete these readings the way WaterReading.delete() deletes one: with
+        sync tombstones and a snapshot (and series) refresh, once per meter.
+        Plain QuerySet.delete() skips both, so bulk deletes should use this.
+        """
+        with transaction.atomic():
+            rows = list(self.values_list('pk', 'meter_id', 'meter__user_id'))
+            SyncTombstone.objects.bulk_create([
+                SyncTombstone(user_id=user_id, kind=SyncTombstone.READING, object_id=pk)
+                for pk, _, user_id in rows
+            ])
+            result = WaterReading.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            for meter in WaterMeter.objects.filter(pk__in={meter_id for _, meter_id, _ in rows}):
+                meter.refresh_snapshot()
+        return result
+
 
 class WaterReading(models.Model):
     meter = models.ForeignKey(WaterMeter, on_delete=models.CASCADE, related_name='readings')
@@ -35,14 +167,136 @@ class WaterReading(models.Model):
     processed = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set by the admin's OCR actions and cleared once the re-run has been tried (utilities/ocr_queue.py)
+    ocr_requested_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = WaterReadingQuerySet.as_manager()
     
     class Meta:
         ordering = ['-timestamp']
         unique_together = ['meter', 'timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='reading_timestamp_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='reading_updated_id_idx'),
+            # Only the few readings waiting for OCR are indexed
+            models.Index(
+                fields=['id'], condition=models.Q(ocr_requested_at__isnull=False), name='reading_ocr_requested_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.meter.name} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_meter_id = instance.__dict__.get('meter_id')
+        instance._loaded_timestamp = instance.__dict__.get('timestamp')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .series import month_of
+
+        adding = self._state.adding
+        previous_meter_id = getattr(self, '_loaded_meter_id', None)
+        # Series blocks holding this reading before and after the save
+        previous_timestamp = getattr(self, '_loaded_timestamp', None)
+        months = {month_of(self.timestamp)} | ({month_of(previous_timestamp)} if previous_timestamp else set())
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                WaterMeter.objects.filter(pk=self.meter_id).update(reading_count=F('reading_count') + 1)
+                self.meter.refresh_snapshot(count=False, months=months)
+            elif previous_meter_id and previous_meter_id != self.meter_id:
+                # Reading moved to another meter: both snapshots change
+                WaterMeter.objects.get(pk=previous_meter_id).refresh_snapshot(months=months)
+                self.meter.refresh_snapshot(months=months)
+            else:
+                self.meter.refresh_snapshot(count=False, months=months)
+        self._loaded_meter_id = self.meter_id
+        self._loaded_timestamp = self.timestamp
+
+    def delete(self, *args, **kwargs):
+        from .series import month_of
+
+        meter = self.meter
+        with transaction.atomic():
+            SyncTombstone.objects.create(user_id=meter.user_id, kind=SyncTombstone.READING, object_id=self.pk)
+            result = super().delete(*args, **kwargs)
+            WaterMeter.objects.filter(pk=meter.pk).update(reading_count=F('reading_count') - 1)
+            meter.refresh_snapshot(count=False, months={month_of(self.timestamp)})
+        return result
+
+
+class ArchivedReading(models.Model):
+    """
+    Cold copy of a raw reading removed from WaterReading by retention
+    compaction (see utilities/retention.py). The readings left behind keep
+    each period's last value, so usage between them is unchanged.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    meter = models.ForeignKey(WaterMeter, on_delete=models.CASCADE, related_name='archived_readings')
+    image = models.CharField(max_length=100, blank=True)
+    reading_value = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True)
+    timestamp = models.DateTimeField()
+    processed = models.BooleanField(default=False)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['meter', 'timestamp'], name='archived_meter_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.meter.name} - {self.timestamp.strftime('%Y-%m-%d %H:%M')} (archived)"
+
+
+class ReadingBlock(models.Model):
+    """
+    One meter-month of processed readings packed as (epoch seconds, value in
+    thousandths) int64 pairs; see utilities/series.py. Derived from
+    WaterReading and only maintained while SERIES_STORE is on.
+    """
+    meter = models.ForeignKey(WaterMeter, on_delete=models.CASCADE, related_name='series_blocks')
+    month = models.DateField(help_text="First day of the month (UTC)")
+    count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['meter', 'month']
+        unique_together = ['meter', 'month']
+
+    def __str__(self):
+        return f"{self.meter.name} - {self.month:%Y-%m} ({self.count} readings)"
+
+
+class SyncTombstone(models.Model):
+    """Deletion record so offline clients can drop meters and readings on their next sync"""
+    METER = 'meter'
+    READING = 'reading'
+    KINDS = [
+        (METER, 'Meter'),
+        (READING, 'Reading'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_tombstones')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
 
 class WaterUsage(models.Model):
     meter = models.ForeignKey(WaterMeter, on_delete=models.CASCADE, related_name='usage_records')
@@ -0,0 +1,127 @@
+"""
+Background OCR re-runs for admin actions.
+
+The admin marks the chosen readings with ``request_ocr()`` (one UPDATE
+however many there are) and calls ``ocr_queue.kick()``, which starts a
+daemon thread in the same process that works through every marked reading
+one at a time, the way config.tracing exports spans. A reading gets the new
+value when Gemini reads one and is left alone otherwise; either way its mark
+is cleared.
+
+The marks are the queue, so nothing is lost when the process goes away
+(gunicorn recycles workers after ``max_requests``) or when another worker
+handled the request: the next kick in any process, or ``manage.py
+reprocess_readings --select requested``, carries on with what is still
+marked. A cache lock keeps two processes from draining at the same time.
+"""
+
+import logging
+import os
+import threading
+
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import QuerySet
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REQUEST_BATCH_SIZE = 1000
+DRAIN_LOCK = 'ocr_queue:drain'
+DRAIN_LOCK_TIMEOUT = 300  # seconds without progress before another process may take over
+
+
+def request_ocr(readings):
+    """Mark ``readings`` (a queryset or reading ids) for an OCR re-run; returns how many were marked"""
+    from .models import WaterReading
+
+    now = timezone.now()
+    if isinstance(readings, QuerySet):
+        return readings.update(ocr_requested_at=now)
+    reading_ids, marked = list(readings), 0
+    for start in range(0, len(reading_ids), REQUEST_BATCH_SIZE):
+        batch = reading_ids[start:start + REQUEST_BATCH_SIZE]
+        marked += WaterReading.objects.filter(pk__in=batch).update(ocr_requested_at=now)
+    return marked
+
+
+def rerun_ocr(reading, reader):
+    """OCR ``reading``'s image again and save the value if one is read; return the value or None"""
+    from .models import WaterReading
+
+    value = None
+    if reading.image:
+        value, _ = reader.extract_reading_from_image(reading.image.path, reading.meter.meter_type)
+    requested, reading.ocr_requested_at = reading.ocr_requested_at, None
+    if value is not None:
+        reading.reading_value = value
+        reading.processed = True
+        reading.save()
+    elif requested is not None:
+        WaterReading.objects.filter(pk=reading.pk).update(ocr_requested_at=None)
+    return value
+
+
+class OcrQueue:
+    def __init__(self):
+        self._thread = None
+        self._wanted = False
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+
+    def kick(self):
+        """Make sure marked readings get worked through, starting the thread if it is not running"""
+        with self._lock:
+            self._wanted = True
+            # A forked worker inherits the object but not the thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ocr-queue', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Readings marked during the last pass are picked up by another one
+                if not self._wanted:
+                    self._thread = None
+                    return
+                self._wanted = False
+            try:
+                self._drain()
+            except Exception:
+                logger.exception('OCR queue pass failed')
+            finally:
+                close_old_connections()
+
+    def _drain(self):
+        from .models import WaterReading
+        from .services import GeminiWaterMeterReader
+
+        if not cache.add(DRAIN_LOCK, os.getpid(), DRAIN_LOCK_TIMEOUT):
+            # Another process is draining and keeps going until nothing is marked
+            return
+        try:
+            reader, last_id = None, 0
+            while True:
+                close_old_connections()
+                # One pass in id order; a reading that fails stays marked for the next pass
+                reading = WaterReading.objects.select_related('meter').filter(
+                    ocr_requested_at__isnull=False, pk__gt=last_id,
+                ).order_by('pk').first()
+                if reading is None:
+                    return
+                last_id = reading.pk
+                cache.touch(DRAIN_LOCK, DRAIN_LOCK_TIMEOUT)
+                try:
+                    reader = reader or GeminiWaterMeterReader()
+                    rerun_ocr(reading, reader)
+                    self.processed += 1
+                except Exception:
+                    self.failed += 1
+                    logger.exception('OCR re-run of reading %s failed', reading.pk)
+        finally:
+            cache.delete(DRAIN_LOCK)
+
+
+ocr_queue = OcrQueue()
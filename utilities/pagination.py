@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_MIN = 100000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a (timestamp, id) key, newest first.
+
+    Each page is a single indexed range scan (``LIMIT page_size + 1``), so the
+    cost of a page does not depend on how deep into the history it is.
+    """
+
+    def __init__(self, queryset, page_size=25, field='timestamp'):
+        self.queryset = queryset
+        self.page_size = page_size
+        self.field = field
+
+    @staticmethod
+    def encode_cursor(value, pk, direction='next'):
+        payload = json.dumps([direction, value.isoformat(), pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if direction not in ('next', 'prev'):
+                raise ValueError(direction)
+            return direction, datetime.fromisoformat(value), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise InvalidCursor(cursor)
+
+    def get_page(self, cursor=None):
+        field = self.field
+        direction = 'next'
+        qs = self.queryset
+
+        if cursor:
+            direction, value, pk = self.decode_cursor(cursor)
+            if direction == 'next':
+                qs = qs.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+            else:
+                qs = qs.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}))
+
+        if direction == 'next':
+            qs = qs.order_by(f'-{field}', '-id')
+        else:
+            qs = qs.order_by(field, 'id')
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == 'prev':
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        first, last = rows[0], rows[-1]
+        if direction == 'next':
+            next_cursor = self.encode_cursor(getattr(last, field), last.pk, 'next') if has_more else None
+            previous_cursor = self.encode_cursor(getattr(first, field), first.pk, 'prev') if cursor else None
+        else:
+            next_cursor = self.encode_cursor(getattr(last, field), last.pk, 'next')
+            previous_cursor = self.encode_cursor(getattr(first, field), first.pk, 'prev') if has_more else None
+
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of large tables.
+
+    An unfiltered changelist on PostgreSQL takes its row count from the
+    planner statistics (``pg_class.reltuples``, kept current by autovacuum)
+    instead of a COUNT(*) that reads the whole table. Filtered lists, tables
+    under ESTIMATED_COUNT_MIN rows and other databases are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None and estimate >= ESTIMATED_COUNT_MIN:
+            return estimate
+        return super().count
+
+    def _estimate(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or queryset.query.where:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # -1 until the table is first analyzed
+        return row[0] if row and row[0] >= 0 else None
@@ -0,0 +1,208 @@
+"""
+Batch OCR re-runs for readings that need another look.
+
+Two kinds of readings are selected, per meter:
+
+- ``unprocessed``: uploads whose OCR never produced a value
+- ``negative``: processed readings lower than the meter's previous one, the
+  same "negative usage" rows usage analytics flags (misreads, but also
+  genuine rollovers, which simply read the same again)
+
+and, on their own, ``requested`` readings: the ones the admin's OCR actions
+marked and the web process has not got to yet (see utilities/ocr_queue.py).
+
+Reprocessor works through the selected ids in ascending order with at most
+``concurrency`` Gemini calls at a time. Every few seconds, and when it stops
+for any reason, it saves a checkpoint: the id up to which every selected
+reading is done. An interrupted run waits for the calls already running and
+the next run picks up after the checkpoint, so no reading is sent twice and
+none is skipped.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import connection
+
+from .models import WaterReading
+from .ocr_queue import rerun_ocr
+
+logger = logging.getLogger(__name__)
+
+SELECTIONS = ('unprocessed', 'negative', 'both', 'requested')
+REPROCESS_CONCURRENCY = 4
+CHECKPOINT_EVERY = 5.0  # seconds between checkpoint writes
+
+
+def unprocessed_ids(meters):
+    return WaterReading.objects.filter(meter__in=meters, processed=False).exclude(image='').values_list('pk', flat=True)
+
+
+def negative_delta_ids(meters):
+    """Ids of processed readings whose value is below the meter's previous processed reading"""
+    readings = WaterReading.objects.filter(
+        meter__in=meters, processed=True, reading_value__isnull=False,
+    ).order_by('meter_id', 'timestamp').values_list('pk', 'meter_id', 'reading_value')
+    flagged = []
+    current_meter, previous_value = None, None
+    for pk, meter_id, value in readings.iterator():
+        if meter_id == current_meter and value < previous_value:
+            flagged.append(pk)
+        current_meter, previous_value = meter_id, value
+    return flagged
+
+
+def requested_ids(meters):
+    return WaterReading.objects.filter(meter__in=meters, ocr_requested_at__isnull=False).values_list('pk', flat=True)
+
+
+def select_reading_ids(meters, selection='both'):
+    """Sorted ids of the readings of ``meters`` that ``selection`` picks"""
+    if selection not in SELECTIONS:
+        raise ValueError(f"Unknown selection '{selection}'; expected one of {', '.join(SELECTIONS)}")
+    ids = set()
+    if selection in ('unprocessed', 'both'):
+        ids.update(unprocessed_ids(meters).iterator())
+    if selection in ('negative', 'both'):
+        ids.update(negative_delta_ids(meters))
+    if selection == 'requested':
+        ids.update(requested_ids(meters).iterator())
+    return sorted(ids)
+
+
+class Checkpoint:
+    """JSON file with the run's selection, the id everything up to is done, and counts so far"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state):
+        # Write then rename, so an interruption never leaves half a file
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ReprocessResult:
+    __slots__ = ('total', 'done', 'updated', 'unchanged', 'unclear', 'failed', 'last_id')
+
+    def __init__(self, total=0, done=0, updated=0, unchanged=0, unclear=0, failed=0, last_id=0):
+        self.total = total
+        self.done = done
+        self.updated = updated
+        self.unchanged = unchanged
+        self.unclear = unclear
+        self.failed = failed
+        self.last_id = last_id  # every selected reading up to this id is done
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def summary(self):
+        return (
+            f'{self.done} of {self.total} readings: {self.updated} updated, {self.unchanged} unchanged, '
+            f'{self.unclear} unreadable, {self.failed} failed'
+        )
+
+
+class Reprocessor:
+    def __init__(self, concurrency=REPROCESS_CONCURRENCY, reader_factory=None):
+        self.concurrency = concurrency
+        if reader_factory is None:
+            from .services import GeminiWaterMeterReader
+
+            reader_factory = GeminiWaterMeterReader
+        self.reader_factory = reader_factory
+        self._local = threading.local()
+
+    def run(self, reading_ids, result=None, checkpoint=None, progress=None, limit=None):
+        """
+        Re-run OCR on ``reading_ids`` (ascending), skipping ids up to
+        ``result.last_id`` when resuming a run. ``progress`` is called with
+        the result after every reading and ``checkpoint`` at most every
+        CHECKPOINT_EVERY seconds and once at the end, also when interrupted.
+        """
+        result = result or ReprocessResult(total=len(reading_ids))
+        pending = iter([pk for pk in reading_ids if pk > result.last_id][:limit])
+        in_flight = {}  # future -> reading id
+        submitted = result.last_id
+        last_saved = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='reprocess') as executor:
+            try:
+                while True:
+                    # Only as many calls as workers, never the whole backlog
+                    while len(in_flight) < self.concurrency:
+                        pk = next(pending, None)
+                        if pk is None:
+                            break
+                        in_flight[executor.submit(self._process, pk)] = submitted = pk
+                    if not in_flight:
+                        break
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._record(result, future, in_flight.pop(future))
+                    # Ids go out in order, so everything below the oldest running one is done
+                    result.last_id = min(in_flight.values()) - 1 if in_flight else submitted
+                    if progress:
+                        progress(result)
+                    if checkpoint and time.monotonic() - last_saved >= CHECKPOINT_EVERY:
+                        checkpoint(result)
+                        last_saved = time.monotonic()
+            finally:
+                # On an interruption, let running calls finish so the checkpoint is exact
+                for future in wait(in_flight).done:
+                    self._record(result, future, in_flight[future])
+                if in_flight:
+                    result.last_id = max(in_flight.values())
+                if checkpoint:
+                    checkpoint(result)
+        return result
+
+    @staticmethod
+    def _record(result, future, pk):
+        exception = future.exception()
+        if exception is not None:
+            logger.error('OCR re-run of reading %s failed', pk, exc_info=exception)
+        outcome = 'failed' if exception is not None else future.result()
+        setattr(result, outcome, getattr(result, outcome) + 1)
+        result.done += 1
+
+    def _reader(self):
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            reader = self._local.reader = self.reader_factory()
+        return reader
+
+    def _process(self, pk):
+        try:
+            reading = WaterReading.objects.select_related('meter').filter(pk=pk).first()
+            if reading is None:
+                return 'unchanged'
+            before = (reading.processed, reading.reading_value)
+            value = rerun_ocr(reading, self._reader())
+            if value is None:
+                return 'unclear'
+            reading.refresh_from_db(fields=['processed', 'reading_value'])
+            return 'unchanged' if (reading.processed, reading.reading_value) == before else 'updated'
+        finally:
+            # Worker threads each hold a connection; don't leave them open after the run
+            connection.close()
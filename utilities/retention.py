@@ -0,0 +1,147 @@
+"""
+Tiered retention for raw readings.
+
+Readings are cumulative register values, so usage between two kept readings
+does not depend on the readings in between. Compaction therefore keeps, per
+meter:
+
+- the last processed reading of each day for readings older than
+  ``daily_after`` days, and of each month older than ``monthly_after`` days
+- the meter's first processed reading, so usage before the first kept
+  period end still counts
+- every reading of a period whose values go backwards (a rollover or
+  misread), so analytics still flag it
+
+Everything else (including unprocessed uploads) is copied to ArchivedReading
+and deleted from WaterReading, with sync tombstones so clients drop it too.
+Usage totals are unchanged, and so are the analytics averages and
+predictions, which weigh usage by the days between readings; they just see
+fewer points in the compacted past. Image files are kept unless
+``delete_images`` is set; the archive keeps their paths either way.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedReading, SyncTombstone, WaterMeter, WaterReading
+
+RETENTION_BATCH_SIZE = 1000
+ARCHIVED_FIELDS = ('id', 'meter_id', 'image', 'reading_value', 'timestamp', 'processed', 'notes', 'created_at')
+
+
+class RetentionResult:
+    __slots__ = ('meters', 'scanned', 'kept', 'archived', 'images_deleted')
+
+    def __init__(self):
+        self.meters = 0
+        self.scanned = 0
+        self.kept = 0
+        self.archived = 0
+        self.images_deleted = 0
+
+    def summary(self):
+        return (
+            f'{self.meters} meters: {self.archived} of {self.scanned} old readings archived, '
+            f'{self.kept} kept, {self.images_deleted} images deleted'
+        )
+
+
+def _period(timestamp, monthly_cutoff):
+    local = timezone.localtime(timestamp)
+    if timestamp < monthly_cutoff:
+        return local.year, local.month
+    return local.date()
+
+
+class RetentionPolicy:
+    def __init__(self, daily_after=None, monthly_after=None, batch_size=RETENTION_BATCH_SIZE,
+                 delete_images=False, dry_run=False, now=None):
+        self.daily_after = settings.RETENTION_DAILY_AFTER_DAYS if daily_after is None else daily_after
+        self.monthly_after = settings.RETENTION_MONTHLY_AFTER_DAYS if monthly_after is None else monthly_after
+        if self.monthly_after < self.daily_after:
+            raise ValueError('monthly_after must not be shorter than daily_after')
+        now = now or timezone.now()
+        self.daily_cutoff = now - timedelta(days=self.daily_after)
+        self.monthly_cutoff = now - timedelta(days=self.monthly_after)
+        self.batch_size = batch_size
+        self.delete_images = delete_images
+        self.dry_run = dry_run
+
+    def run(self, meters=None, progress=None):
+        result = RetentionResult()
+        meters = WaterMeter.objects.all() if meters is None else meters
+        for meter in meters.order_by('pk').iterator():
+            archive_ids = self.plan(meter, result)
+            result.meters += 1
+            if archive_ids and not self.dry_run:
+                try:
+                    for start in range(0, len(archive_ids), self.batch_size):
+                        self._archive(meter, archive_ids[start:start + self.batch_size], result)
+                finally:
+                    meter.refresh_snapshot()
+            elif archive_ids:
+                result.archived += len(archive_ids)
+            if progress:
+                progress(meter, result)
+        return result
+
+    def plan(self, meter, result):
+        """Ids of the meter's readings older than the daily cutoff that can be archived"""
+        archive_ids = []
+        first_valued = WaterReading.objects.filter(
+            meter=meter, processed=True, reading_value__isnull=False,
+        ).order_by('timestamp').values_list('id', flat=True).first()
+        previous_value = None  # last processed value before the current period
+        period, rows = None, []
+
+        def close_period():
+            nonlocal previous_value
+            valued = [(pk, value) for pk, value, processed in rows if processed and value is not None]
+            values = [value for _, value in valued]
+            if previous_value is not None:
+                values.insert(0, previous_value)
+            if any(later < earlier for earlier, later in zip(values, values[1:])):
+                keep = {pk for pk, _, _ in rows}
+            else:
+                keep = {valued[-1][0]} if valued else set()
+            keep.add(first_valued)
+            archive_ids.extend(pk for pk, _, _ in rows if pk not in keep)
+            result.kept += sum(1 for pk, _, _ in rows if pk in keep)
+            if valued:
+                previous_value = valued[-1][1]
+
+        old = WaterReading.objects.filter(meter=meter, timestamp__lt=self.daily_cutoff).order_by('timestamp')
+        for pk, timestamp, value, processed in old.values_list('id', 'timestamp', 'reading_value', 'processed').iterator():
+            result.scanned += 1
+            key = _period(timestamp, self.monthly_cutoff)
+            if key != period and rows:
+                close_period()
+                rows = []
+            period = key
+            rows.append((pk, value, processed))
+        if rows:
+            close_period()
+        return archive_ids
+
+    def _archive(self, meter, ids, result):
+        readings = list(WaterReading.objects.filter(pk__in=ids).values(*ARCHIVED_FIELDS))
+        with transaction.atomic():
+            ArchivedReading.objects.bulk_create([
+                ArchivedReading(original_id=row.pop('id'), **row) for row in map(dict, readings)
+            ], ignore_conflicts=True)
+            SyncTombstone.objects.bulk_create([
+                SyncTombstone(user_id=meter.user_id, kind=SyncTombstone.READING, object_id=row['id'])
+                for row in readings
+            ])
+            WaterReading.objects.filter(pk__in=ids).delete()
+        result.archived += len(readings)
+        if self.delete_images:
+            # After the commit, so a failed batch never loses an image
+            for row in readings:
+                if row['image']:
+                    default_storage.delete(row['image'])
+                    result.images_deleted += 1
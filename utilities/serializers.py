@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import WaterMeter, WaterReading
+
+
+class SparseFieldsMixin:
+    """
+    Limit the serialized fields with a ``?fields=id,timestamp`` query parameter.
+    Unknown names are ignored; ``id`` is always kept so clients can page and update.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        wanted = {name.strip() for name in requested.split(',') if name.strip()} | {'id'}
+        for name in list(self.fields):
+            if name not in wanted:
+                self.fields.pop(name)
+
+
+class UserMeterField(serializers.PrimaryKeyRelatedField):
+    """Meter owned by request.user; each distinct id is looked up once per payload"""
+
+    def get_queryset(self):
+        return WaterMeter.objects.filter(user=self.context['request'].user)
+
+    def to_internal_value(self, data):
+        cache = self.context.setdefault('_meter_cache', {})
+        key = str(data)
+        if key not in cache:
+            cache[key] = super().to_internal_value(data)
+        return cache[key]
+
+
+class WaterMeterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    meter_type_display = serializers.CharField(source='get_meter_type_display', read_only=True)
+
+    class Meta:
+        model = WaterMeter
+        fields = [
+            'id', 'name', 'meter_type', 'meter_type_display', 'cost_per_unit', 'is_active', 'created_at',
+            'reading_count', 'latest_reading_value', 'latest_reading_at', 'updated_at',
+        ]
+        read_only_fields = ['created_at', 'reading_count', 'latest_reading_value', 'latest_reading_at', 'updated_at']
+
+
+class WaterReadingListSerializer(serializers.ListSerializer):
+    """Bulk create/update of readings in one transaction with one snapshot refresh per meter"""
+
+    def create(self, validated_data):
+        readings = [WaterReading(**item) for item in validated_data]
+        with transaction.atomic():
+            created = WaterReading.objects.bulk_create(readings)
+            self._refresh_meters({reading.meter_id for reading in readings})
+        return created
+
+    def update(self, instances, validated_data):
+        by_id = {instance.pk: instance for instance in instances}
+        touched_fields = set()
+        meter_ids = {instance.meter_id for instance in instances}
+        for item in validated_data:
+            instance = by_id.get(item.pop('id', None))
+            if instance is None:
+                raise serializers.ValidationError('Every reading in a bulk update needs the id of one of your readings.')
+            for field, value in item.items():
+                setattr(instance, field, value)
+                touched_fields.add(field)
+            meter_ids.add(instance.meter_id)
+        now = timezone.now()
+        for instance in instances:
+            instance.updated_at = now
+        with transaction.atomic():
+            if touched_fields:
+                WaterReading.objects.bulk_update(instances, sorted(touched_fields | {'updated_at'}), batch_size=500)
+            self._refresh_meters(meter_ids)
+        return instances
+
+    @staticmethod
+    def _refresh_meters(meter_ids):
+        # bulk_create/bulk_update bypass WaterReading.save(), so rebuild snapshots once per meter
+        for meter in WaterMeter.objects.filter(pk__in=meter_ids):
+            meter.refresh_snapshot()
+
+
+class WaterReadingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    meter = UserMeterField()
+    meter_name = serializers.CharField(source='meter.name', read_only=True)
+    meter_type = serializers.CharField(source='meter.meter_type', read_only=True)
+    image = serializers.ImageField(required=False, allow_null=True)
+
+    class Meta:
+        model = WaterReading
+        fields = [
+            'id', 'meter', 'meter_name', 'meter_type', 'reading_value', 'timestamp',
+            'processed', 'notes', 'image', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['created_at', 'updated_at']
+        list_serializer_class = WaterReadingListSerializer
+
+    def validate(self, attrs):
+        if attrs.get('image') is None:
+            attrs.pop('image', None)
+        return attrs
+
+
+class WaterReadingBulkSerializer(WaterReadingSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta(WaterReadingSerializer.Meta):
+        # A per-row uniqueness query would make bulk payloads O(n) round trips;
+        # (meter, timestamp) is enforced by the database constraint instead
+        validators = []
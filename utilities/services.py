@@ -1,27 +1,37 @@
-import google.generativeai as genai
+import asyncio
 from django.conf import settings
-from PIL import Image
-from PIL.ExifTags import TAGS
 import os
+import time
 from django.utils import timezone
 import pytz
 import re
 from datetime import datetime, timezone as dt_timezone, timedelta
 import logging
 
+from config.metrics import OCR_DURATION
+from config.tracing import span
+
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL = 'gemini-1.5-flash'
+
 
 class GeminiWaterMeterReader:
     def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # The SDK drags in gRPC/protobuf (~0.5s); import it on first use, not when the views load
+        import google.generativeai as genai
+
+        options = {}
+        if settings.GEMINI_TRANSPORT:
+            options['transport'] = settings.GEMINI_TRANSPORT
+        if settings.GEMINI_API_ENDPOINT:
+            options['client_options'] = {'api_endpoint': settings.GEMINI_API_ENDPOINT}
+        genai.configure(api_key=settings.GEMINI_API_KEY, **options)
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
     
-    def extract_reading_from_image(self, image_path, meter_type='water'):
-        try:
-            image = Image.open(image_path)
-            
-            prompt = f"""
+    @staticmethod
+    def _build_prompt(meter_type):
+        return f"""
             Analyze this {meter_type} meter reading image and extract the current reading value.
             
             Instructions:
@@ -33,27 +43,95 @@ class GeminiWaterMeterReader:
             
             Response format: Just the number or "UNCLEAR"
             """
-            
-            response = self.model.generate_content([prompt, image])
-            reading_text = response.text.strip()
-            
-            # Extract numerical value
-            number_match = re.search(r'\d+\.?\d*', reading_text)
-            if number_match:
-                reading_value = float(number_match.group())
-                return reading_value, None
-            else:
-                return None, None
+    
+    @staticmethod
+    def _parse_reading(response):
+        reading_text = response.text.strip()
+        
+        # Extract numerical value
+        number_match = re.search(r'\d+\.?\d*', reading_text)
+        if number_match:
+            reading_value = float(number_match.group())
+            return reading_value, None
+        else:
+            return None, None
+    
+    @staticmethod
+    def _observe(mode, started, outcome):
+        OCR_DURATION.observe(time.perf_counter() - started, mode=mode, outcome=outcome)
+
+    @staticmethod
+    def _request_span(mode):
+        return span('ocr.request', {'ocr.model': GEMINI_MODEL, 'ocr.mode': mode})
+
+    def _record_response(self, current, mode, started, response, result):
+        outcome = 'ok' if result[0] is not None else 'unclear'
+        current.set_attribute('ocr.outcome', outcome)
+        current.set_attribute('ocr.response_chars', len(response.text))
+        self._observe(mode, started, outcome)
+
+    def extract_reading_from_image(self, image_path, meter_type='water'):
+        started = None
+        try:
+            image = self._load_image(image_path)
+            with self._request_span('sync') as current:
+                started = time.perf_counter()
+                response = self.model.generate_content([self._build_prompt(meter_type), image])
+                result = self._parse_reading(response)
+                self._record_response(current, 'sync', started, response, result)
+            return result
                 
         except Exception as e:
+            if started is not None:
+                self._observe('sync', started, 'error')
             logger.error(f"Error processing image with Gemini: {e}")
             return None, None
     
+    async def extract_reading_from_image_async(self, image_path, meter_type='water'):
+        """Same as extract_reading_from_image(), but awaits the Gemini call instead of blocking a thread"""
+        started = None
+        try:
+            # Decoding the image is local disk/CPU work; keep it off the event loop
+            image = await asyncio.to_thread(self._load_image, image_path)
+            with self._request_span('async') as current:
+                started = time.perf_counter()
+                contents = [self._build_prompt(meter_type), image]
+                if settings.GEMINI_TRANSPORT == 'rest':
+                    # The SDK's async client only speaks gRPC
+                    response = await asyncio.to_thread(self.model.generate_content, contents)
+                else:
+                    response = await self.model.generate_content_async(contents)
+                result = self._parse_reading(response)
+                self._record_response(current, 'async', started, response, result)
+            return result
+                
+        except Exception as e:
+            if started is not None:
+                self._observe('async', started, 'error')
+            logger.error(f"Error processing image with Gemini: {e}")
+            return None, None
+    
+    @staticmethod
+    def _load_image(image_path):
+        from PIL import Image
+
+        with span('ocr.image_decode') as current:
+            image = Image.open(image_path)
+            image.load()
+            current.set_attribute('image.format', image.format)
+            current.set_attribute('image.width', image.width)
+            current.set_attribute('image.height', image.height)
+        return image
+    
 
 
 class ImageMetadataExtractor:
     @staticmethod
     def extract_timestamp_from_image(image_path_or_file):
+        # Pillow's plugin and EXIF tag tables are only needed once an upload arrives
+        from PIL import Image
+        from PIL.ExifTags import TAGS
+
         try:
             # Ensure file-like objects are at the start
             if hasattr(image_path_or_file, 'seek'):
@@ -223,11 +301,12 @@ class WaterUsageCalculator:
         return 0
     
     @staticmethod
-    def predict_monthly_cost(daily_usages, cost_per_unit=0.005):
+    def predict_monthly_cost(daily_usages, cost_per_unit=0.005, days=None):
+        """With ``days``, ``daily_usages`` are usages over intervals that many days long"""
         if not daily_usages:
             return 0, 0
         
-        average_daily = sum(daily_usages) / len(daily_usages)
+        average_daily = sum(daily_usages) / (sum(days) if days else len(daily_usages))
         days_in_month = 30
         predicted_monthly_usage = average_daily * days_in_month
         predicted_cost = predicted_monthly_usage * cost_per_unit
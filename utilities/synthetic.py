@@ -0,0 +1,151 @@
+"""
+Synthetic household data and a fake OCR backend for benchmarks and load tests.
+
+Readings are irregular (bursty gaps, the odd holiday), follow a seasonal
+consumption curve with day-to-day noise, wrap around at the register limit
+like a real five-digit meter, and include the failure modes seen in practice:
+uploads still waiting for OCR and the occasional misread digit.
+"""
+
+import asyncio
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import WaterMeter, WaterReading
+from .services import GeminiWaterMeterReader
+
+METER_ROLLOVER = 100000  # litres; five register wheels
+BATCH_SIZE = 5000
+PLACEHOLDER_IMAGE = 'water_readings/synthetic.jpg'
+
+# (name, meter type, typical litres per day)
+METER_PROFILES = [
+    ('Kitchen cold', 'cold', 160),
+    ('Bathroom hot', 'hot', 70),
+    ('Bathroom cold', 'cold', 110),
+    ('Kitchen hot', 'hot', 45),
+    ('Garden', 'cold', 60),
+]
+
+PENDING_RATE = 0.02  # uploads whose OCR never finished
+MISREAD_RATE = 0.01  # OCR dropped or doubled a digit
+HOLIDAY_RATE = 0.01  # chance that a gap becomes a 1-4 week absence
+
+
+def _reading_times(rng, start, end, readings_per_week):
+    mean_gap_hours = 7 * 24 / readings_per_week
+    at = start
+    while True:
+        if rng.random() < HOLIDAY_RATE:
+            gap = timedelta(days=rng.uniform(7, 28))
+        else:
+            gap = timedelta(hours=max(2.0, rng.expovariate(1 / mean_gap_hours)))
+        at += gap
+        if at >= end:
+            return
+        # People read meters while awake, but not later today than ``end``
+        awake = at.replace(hour=rng.randint(6, 22), minute=rng.randint(0, 59), second=rng.randint(0, 59))
+        yield awake if awake < end else at
+
+
+def _meter_readings(rng, meter, daily_litres, start, end, readings_per_week):
+    register = rng.uniform(0, METER_ROLLOVER)
+    previous = start
+    for at in _reading_times(rng, start, end, readings_per_week):
+        if at <= previous:
+            continue
+        days = (at - previous).total_seconds() / 86400
+        season = 1 + 0.2 * math.sin(2 * math.pi * at.timetuple().tm_yday / 365)
+        register += daily_litres * season * days * rng.lognormvariate(0, 0.25)
+        previous = at
+
+        value = Decimal(register % METER_ROLLOVER).quantize(Decimal('0.001'))
+        processed = True
+        roll = rng.random()
+        if roll < PENDING_RATE:
+            value, processed = None, False
+        elif roll < PENDING_RATE + MISREAD_RATE:
+            value = (value * 10 if rng.random() < 0.5 else value / 10).quantize(Decimal('0.001'))
+
+        yield WaterReading(
+            meter=meter, image=PLACEHOLDER_IMAGE, timestamp=at,
+            reading_value=value, processed=processed,
+        )
+
+
+def generate_households(users=10, meters_per_user=2, years=2.0, readings_per_week=3.0,
+                        seed=0, prefix='household', password='household', now=None, progress=None):
+    """
+    Create ``users`` reader accounts, each with ``meters_per_user`` meters and
+    ``years`` of readings, using bulk inserts. Usernames are ``<prefix>NNNN``.
+    Returns counts of what was created.
+    """
+    rng = random.Random(seed)
+    end = now or timezone.now()
+    start = end - timedelta(days=365 * years)
+    User = get_user_model()
+    password_hash = make_password(password)
+
+    with transaction.atomic():
+        accounts = User.objects.bulk_create([
+            User(username=f'{prefix}{i:04d}', password=password_hash, role='reader')
+            for i in range(users)
+        ])
+        profiles = [METER_PROFILES[j % len(METER_PROFILES)] for _ in accounts for j in range(meters_per_user)]
+        meters = WaterMeter.objects.bulk_create([
+            WaterMeter(
+                user=user, name=name, meter_type=meter_type,
+                cost_per_unit=Decimal(rng.uniform(0.003, 0.008)).quantize(Decimal('0.0001')),
+            )
+            for user, (name, meter_type, _) in zip(
+                (user for user in accounts for _ in range(meters_per_user)), profiles,
+            )
+        ])
+
+    total = 0
+    for index, (meter, (_, _, typical_litres)) in enumerate(zip(meters, profiles)):
+        # Households differ a lot in how much water they use
+        daily_litres = typical_litres * rng.uniform(0.6, 1.6)
+        batch = []
+        for reading in _meter_readings(rng, meter, daily_litres, start, end, readings_per_week):
+            batch.append(reading)
+            if len(batch) >= BATCH_SIZE:
+                WaterReading.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            WaterReading.objects.bulk_create(batch)
+            total += len(batch)
+        # bulk_create skips WaterReading.save(), so rebuild the snapshot once per meter
+        meter.refresh_snapshot()
+        if progress:
+            progress(index + 1, len(meters), total)
+
+    return {'users': len(accounts), 'meters': len(meters), 'readings': total}
+
+
+@contextmanager
+def fake_ocr(latency=0.0, value=123.456):
+    """Replace the Gemini calls with stubs that wait ``latency`` seconds and return ``value``"""
+    def extract(reader, image_path, meter_type='water'):
+        time.sleep(latency)
+        return value, None
+
+    async def extract_async(reader, image_path, meter_type='water'):
+        await asyncio.sleep(latency)
+        return value, None
+
+    with mock.patch.object(GeminiWaterMeterReader, '__init__', lambda reader: None), \
+            mock.patch.object(GeminiWaterMeterReader, 'extract_reading_from_image', extract), \
+            mock.patch.object(GeminiWaterMeterReader, 'extract_reading_from_image_async', extract_async):
+        yield
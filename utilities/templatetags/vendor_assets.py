@@ -0,0 +1,18 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+
+from utilities.vendor import vendor_path, vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_static(name):
+    """
+    ``{% static %}`` for a file under static/vendor/. In development, before
+    ``manage.py vendor_static`` has run, the pinned CDN copy is linked instead.
+    """
+    if settings.DEBUG and not vendor_path(name).exists():
+        return vendor_url(name)
+    return static(name)
@@ -1,3 +1,611 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from config.testing import Budget, PageBudgetTestCase
+
+from .api import decode_sync_token, encode_sync_token
+from .events import SAFETY_SECONDS, ReadingEventBroker
+from .importer import ReadingImportError, ReadingImporter, read_rows
+from .models import SyncTombstone, WaterMeter, WaterReading
+from .ocr_queue import DRAIN_LOCK, OcrQueue, request_ocr, rerun_ocr
+from .reprocess import select_reading_ids
+from .retention import RetentionPolicy
+from .series import rebuild_blocks
+from .synthetic import generate_households
+from .vendor import VENDOR_ASSETS, check_vendor_assets
+from .views import _compute_usage_analytics
+
+
+class PageBudgetTests(PageBudgetTestCase):
+    urlconf = 'utilities.urls'
+    budgets = {
+        'upload_reading': Budget(max_bytes=40_000),
+        'readings_list': Budget(max_bytes=250_000),
+        # Streams every reading of the user
+        'export_readings': Budget(max_bytes=250_000, max_ms=1000),
+        'edit_reading': Budget(max_bytes=20_000, kwargs=lambda h: {'reading_id': h.reading.pk}),
+        'delete_reading': Budget(max_bytes=15_000, kwargs=lambda h: {'reading_id': h.reading.pk}),
+        'meter_management': Budget(max_bytes=30_000),
+        'edit_meter': Budget(max_bytes=20_000, kwargs=lambda h: {'meter_id': h.meter.pk}),
+        'delete_meter': Budget(max_bytes=20_000, kwargs=lambda h: {'meter_id': h.meter.pk}),
+        # Grows with history: every reading of every meter is charted
+        'usage_analytics': Budget(max_bytes=100_000, max_ms=1000),
+        'api_usage_data': Budget(max_bytes=10_000),
+        'api_sync': Budget(max_bytes=500_000, max_ms=1000),
+        'api-root': Budget(max_bytes=1_000),
+        'api-meter-list': Budget(max_bytes=5_000),
+        'api-meter-detail': Budget(max_bytes=1_000, kwargs=lambda h: {'pk': h.meter.pk}),
+        'api-reading-list': Budget(max_bytes=60_000),
+        'api-reading-detail': Budget(max_bytes=1_000, kwargs=lambda h: {'pk': h.reading.pk}),
+        'api-reading-bulk': Budget(max_bytes=1_000, status=405),
+    }
+    excluded = {
+        'reading_events': 'server-sent event stream that stays open',
+    }
+
+
+class ReadingSnapshotTests(TestCase):
+    """WaterMeter's denormalized snapshot follows every way a reading can change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('snapshot', password='x', role='admin')
+        cls.meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=cls.user)
+        cls.other_meter = WaterMeter.objects.create(name='Bathroom', meter_type='hot', user=cls.user)
+        cls.month_start = WaterMeter.current_month_start()
+
+    def add(self, meter, hours, value, processed=True):
+        return WaterReading.objects.create(
+            meter=meter, image='water_readings/test.jpg', timestamp=self.month_start + timedelta(hours=hours),
+            reading_value=value, processed=processed,
+        )
+
+    def snapshot(self, meter):
+        meter.refresh_from_db()
+        return (
+            meter.reading_count, meter.latest_reading_value, meter.month_start_reading_value, meter.month_reading_count,
+        )
+
+    def test_insert(self):
+        self.add(self.meter, 1, Decimal('10'))
+        self.add(self.meter, 2, Decimal('12'))
+        self.add(self.meter, 3, None, processed=False)
+        self.assertEqual(self.snapshot(self.meter), (3, Decimal('12'), Decimal('10'), 2))
+        self.assertEqual(self.meter.current_month_usage, Decimal('2'))
+
+    def test_backfill_out_of_order(self):
+        self.add(self.meter, 5, Decimal('20'))
+        self.add(self.meter, 1, Decimal('15'))
+        # Last month's reading counts, but not for this month
+        self.add(self.meter, -24, Decimal('5'))
+        self.assertEqual(self.snapshot(self.meter), (3, Decimal('20'), Decimal('15'), 2))
+
+    def test_update(self):
+        reading = self.add(self.meter, 1, Decimal('10'))
+        self.add(self.meter, 2, Decimal('12'))
+        reading.timestamp = self.month_start + timedelta(hours=3)
+        reading.save()
+        self.assertEqual(self.snapshot(self.meter), (2, Decimal('10'), Decimal('12'), 2))
+
+    def test_move_to_other_meter(self):
+        reading = self.add(self.meter, 1, Decimal('10'))
+        self.add(self.meter, 2, Decimal('12'))
+        reading.meter = self.other_meter
+        reading.save()
+        self.assertEqual(self.snapshot(self.meter), (1, Decimal('12'), Decimal('12'), 1))
+        self.assertEqual(self.snapshot(self.other_meter), (1, Decimal('10'), Decimal('10'), 1))
+
+    def test_delete(self):
+        self.add(self.meter, 1, Decimal('10'))
+        latest = self.add(self.meter, 2, Decimal('12'))
+        latest_id = latest.pk
+        latest.delete()
+        self.assertEqual(self.snapshot(self.meter), (1, Decimal('10'), Decimal('10'), 1))
+        self.assertTrue(SyncTombstone.objects.filter(kind=SyncTombstone.READING, object_id=latest_id).exists())
+
+    def test_meter_save_keeps_snapshot(self):
+        stale = WaterMeter.objects.get(pk=self.meter.pk)
+        self.add(self.meter, 1, Decimal('10'))
+        stale.name = 'Kitchen sink'
+        stale.save()
+        self.assertEqual(self.snapshot(self.meter), (1, Decimal('10'), Decimal('10'), 1))
+        self.assertEqual(self.meter.name, 'Kitchen sink')
+
+    def test_rolled_back_write_leaves_snapshot_alone(self):
+        self.add(self.meter, 1, Decimal('10'))
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.add(self.meter, 2, Decimal('12'))
+            raise RuntimeError
+        self.assertEqual(self.snapshot(self.meter), (1, Decimal('10'), Decimal('10'), 1))
+
+    def test_bulk_delete(self):
+        readings = [self.add(self.meter, hours, Decimal(hours)) for hours in (1, 2, 3)]
+        self.add(self.other_meter, 1, Decimal('7'))
+        WaterReading.objects.filter(pk__in=[readings[1].pk, readings[2].pk]).delete_tracked()
+        self.assertEqual(self.snapshot(self.meter), (1, Decimal('1'), Decimal('1'), 1))
+        self.assertEqual(self.snapshot(self.other_meter), (1, Decimal('7'), Decimal('7'), 1))
+        self.assertEqual(
+            set(SyncTombstone.objects.filter(kind=SyncTombstone.READING).values_list('object_id', flat=True)),
+            {readings[1].pk, readings[2].pk},
+        )
+
+    def test_admin_delete_selected(self):
+        reading = self.add(self.meter, 1, Decimal('10'))
+        self.add(self.meter, 2, Decimal('12'))
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.post('/admin/utilities/waterreading/', {
+            'action': 'delete_selected', '_selected_action': [reading.pk], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.snapshot(self.meter), (1, Decimal('12'), Decimal('12'), 1))
+        self.assertTrue(SyncTombstone.objects.filter(kind=SyncTombstone.READING, object_id=reading.pk).exists())
+
+        response = self.client.post('/admin/utilities/watermeter/', {
+            'action': 'delete_selected', '_selected_action': [self.meter.pk], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(SyncTombstone.objects.filter(kind=SyncTombstone.METER, object_id=self.meter.pk).exists())
+
+
+class ApiRoleTests(TestCase):
+    """The API enforces the same roles as the pages: viewers read, readers and admins write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = get_user_model().objects.create_user('viewer', password='x', role='viewer')
+        cls.reader = get_user_model().objects.create_user('reader', password='x', role='reader')
+
+    def setUp(self):
+        self.meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=self.viewer)
+        self.reading = WaterReading.objects.create(
+            meter=self.meter, image='water_readings/test.jpg', timestamp=timezone.now(),
+            reading_value=Decimal('10'), processed=True,
+        )
+
+    def writes(self):
+        meter = {'name': 'Garden', 'meter_type': 'cold'}
+        reading = {'meter': self.meter.pk, 'reading_value': '11.000'}
+        return [
+            ('post', reverse('utilities:api-meter-list'), meter),
+            ('put', reverse('utilities:api-meter-detail', kwargs={'pk': self.meter.pk}), meter),
+            ('patch', reverse('utilities:api-meter-detail', kwargs={'pk': self.meter.pk}), {'name': 'Renamed'}),
+            ('delete', reverse('utilities:api-meter-detail', kwargs={'pk': self.meter.pk}), None),
+            ('post', reverse('utilities:api-reading-list'), reading),
+            ('put', reverse('utilities:api-reading-detail', kwargs={'pk': self.reading.pk}), reading),
+            ('patch', reverse('utilities:api-reading-detail', kwargs={'pk': self.reading.pk}), {'notes': 'x'}),
+            ('delete', reverse('utilities:api-reading-detail', kwargs={'pk': self.reading.pk}), None),
+            ('post', reverse('utilities:api-reading-bulk'), [reading]),
+            ('patch', reverse('utilities:api-reading-bulk'), [{'id': self.reading.pk, 'notes': 'x'}]),
+        ]
+
+    def test_viewer_can_read(self):
+        self.client.force_login(self.viewer)
+        for url in (
+            reverse('utilities:api-meter-list'), reverse('utilities:api-meter-detail', kwargs={'pk': self.meter.pk}),
+            reverse('utilities:api-reading-list'), reverse('utilities:api-reading-detail', kwargs={'pk': self.reading.pk}),
+            reverse('utilities:api_sync'),
+        ):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+
+    def test_viewer_cannot_write(self):
+        self.client.force_login(self.viewer)
+        for method, url, data in self.writes():
+            response = getattr(self.client, method)(url, data, content_type='application/json')
+            self.assertEqual(response.status_code, 403, f'{method.upper()} {url}')
+        self.meter.refresh_from_db()
+        self.assertEqual(self.meter.name, 'Kitchen')
+        self.assertEqual(WaterReading.objects.count(), 1)
+
+    def test_reader_can_write(self):
+        self.client.force_login(self.reader)
+        response = self.client.post(
+            reverse('utilities:api-meter-list'), {'name': 'Garden', 'meter_type': 'cold'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.client.patch(
+            reverse('utilities:api-meter-detail', kwargs={'pk': response.json()['id']}), {'name': 'Orchard'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_is_refused(self):
+        self.assertEqual(self.client.get(reverse('utilities:api-meter-list')).status_code, 403)
+
+    def test_reading_meter_filter(self):
+        self.client.force_login(self.viewer)
+        url = reverse('utilities:api-reading-list')
+        response = self.client.get(url, {'meter': self.meter.pk})
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.reading.pk])
+        response = self.client.get(url, {'meter': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('meter', response.json())
+
+
+class EditReadingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('editor', password='x', role='reader')
+        cls.meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=cls.user)
+        cls.reading = WaterReading.objects.create(
+            meter=cls.meter, image='water_readings/old.jpg', timestamp=timezone.now(),
+            reading_value=Decimal('10'), processed=True,
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.user)
+
+    def test_new_image_is_saved_before_ocr(self):
+        from PIL import Image
+
+        image = io.BytesIO()
+        Image.new('RGB', (4, 4)).save(image, 'PNG')
+        seen = []
+
+        def extract(path, meter_type):
+            seen.append(os.path.exists(path))
+            return 12.5, None
+
+        with mock.patch('utilities.views.GeminiWaterMeterReader') as reader_class:
+            reader_class.return_value.extract_reading_from_image.side_effect = extract
+            response = self.client.post(reverse('utilities:edit_reading', args=[self.reading.pk]), {
+                'meter': self.meter.pk, 'notes': '',
+                'image': SimpleUploadedFile('new.png', image.getvalue(), content_type='image/png'),
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(seen, [True])
+        self.reading.refresh_from_db()
+        self.assertEqual(self.reading.reading_value, Decimal('12.5'))
+
+
+class ReadingEventBrokerTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = ReadingEventBroker()
+        self.queue = asyncio.Queue()
+        self.broker._subscribers[1].add(self.queue)
+        self.start = timezone.now()
+        self.broker._last_seen = self.start
+
+    def row(self, pk, seconds):
+        return {
+            'id': pk, 'meter_id': 1, 'meter__user_id': 1, 'reading_value': None, 'processed': False,
+            'updated_at': self.start + timedelta(seconds=seconds),
+        }
+
+    def pushed(self):
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait()['id'])
+        return events
+
+    def test_late_commit_inside_the_window_is_pushed_once(self):
+        self.broker._dispatch([self.row(1, 60)])
+        self.assertEqual(self.pushed(), [1])
+        self.assertEqual(self.broker._last_seen, self.start + timedelta(seconds=60 - SAFETY_SECONDS))
+
+        # Saved before reading 1 but committed after the last poll
+        late = self.row(2, 50)
+        self.assertGreater(late['updated_at'], self.broker._last_seen)
+        self.broker._dispatch([late, self.row(1, 60)])
+        self.assertEqual(self.pushed(), [2])
+
+        # A later save of the same reading is a new event
+        self.broker._dispatch([self.row(1, 61)])
+        self.assertEqual(self.pushed(), [1])
+
+    def test_watermark_never_moves_back(self):
+        self.broker._dispatch([self.row(1, 5)])
+        self.assertEqual(self.broker._last_seen, self.start)
+        self.broker._dispatch([])
+        self.assertEqual(self.broker._last_seen, self.start)
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('sync', password='x', role='reader')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def sync(self, token=None):
+        return self.client.get(reverse('utilities:api_sync'), {'since': token} if token else {}).json()
+
+    def sync_all(self):
+        meters, readings, token = [], [], None
+        while True:
+            page = self.sync(token)
+            meters += [meter['id'] for meter in page['meters']]
+            readings += [reading['id'] for reading in page['readings']]
+            token = page['next_token']
+            if not page['has_more']:
+                return meters, readings, token
+
+    @mock.patch('utilities.api.SYNC_PAGE_SIZE', 2)
+    def test_meters_and_readings_are_paged(self):
+        meters = [WaterMeter.objects.create(name=f'Meter {n}', meter_type='cold', user=self.user) for n in range(5)]
+        readings = [
+            WaterReading.objects.create(meter=meters[0], image='water_readings/test.jpg', timestamp=timezone.now())
+            for _ in range(3)
+        ]
+        self.assertEqual(len(self.sync()['meters']), 2)
+        synced_meters, synced_readings, _ = self.sync_all()
+        # Each once; adding readings touched the first meter, so it comes last
+        self.assertCountEqual(synced_meters, [meter.pk for meter in meters])
+        self.assertEqual(synced_readings, [reading.pk for reading in readings])
+
+    @override_settings(SYNC_SAFETY_SECONDS=600)
+    def test_next_token_steps_back_by_safety_window(self):
+        before = timezone.now()
+        since, _, meters_since, _ = decode_sync_token(self.sync()['next_token'])
+        self.assertLessEqual(since, before - timedelta(seconds=600) + timedelta(seconds=5))
+        self.assertEqual(since, meters_since)
+
+        # A row saved earlier but committed after that sync is still picked up
+        meter = WaterMeter.objects.create(name='Late', meter_type='cold', user=self.user)
+        WaterMeter.objects.filter(pk=meter.pk).update(updated_at=before - timedelta(seconds=60))
+        self.assertEqual([m['id'] for m in self.sync(encode_sync_token(since, 0))['meters']], [meter.pk])
+
+    def test_token_with_reading_cursor_only_still_works(self):
+        meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=self.user)
+        since = timezone.now() - timedelta(hours=1)
+        # Issued before meters were paged: only [moment, last reading id]
+        old_token = base64.urlsafe_b64encode(json.dumps([since.isoformat(), 0]).encode()).decode().rstrip('=')
+        self.assertEqual(decode_sync_token(old_token), (since, 0, since, 0))
+        self.assertEqual([m['id'] for m in self.sync(old_token)['meters']], [meter.pk])
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('utilities:api_sync'), {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+
+
+class VendorStaticTests(SimpleTestCase):
+    name = 'vendor/plotly/plotly-basic.min.js'
+
+    def render(self):
+        return Template("{% load vendor_assets %}{% vendor_static name %}").render(Context({'name': self.name}))
+
+    def test_missing_file_falls_back_to_cdn_in_debug(self):
+        with mock.patch('utilities.templatetags.vendor_assets.vendor_path') as vendor_path:
+            vendor_path.return_value.exists.return_value = False
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.render(), VENDOR_ASSETS[self.name])
+            self.assertEqual(self.render(), f'/static/{self.name}')
+
+    def test_check_warns_about_missing_files(self):
+        with mock.patch('utilities.vendor.vendor_path') as vendor_path:
+            vendor_path.return_value.exists.return_value = False
+            self.assertEqual([warning.id for warning in check_vendor_assets(None)], ['utilities.W001'])
+            vendor_path.return_value.exists.return_value = True
+            self.assertEqual(check_vendor_assets(None), [])
+
+    def test_vendored_file_is_served_locally(self):
+        with mock.patch('utilities.templatetags.vendor_assets.vendor_path') as vendor_path:
+            vendor_path.return_value.exists.return_value = True
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.render(), f'/static/{self.name}')
+
+
+class SyntheticDataTests(TestCase):
+    def test_no_reading_after_now(self):
+        # Early morning, so most drawn times of day would be later today
+        now = timezone.now().replace(hour=7, minute=0, second=0, microsecond=0)
+        generate_households(users=1, meters_per_user=2, years=0.1, readings_per_week=50, seed=3, now=now)
+        latest = WaterReading.objects.order_by('-timestamp').values_list('timestamp', flat=True).first()
+        self.assertLess(latest, now)
+
+
+class ReadingImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('importer', password='x', role='reader')
+        cls.meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=cls.user)
+        cls.other_meter = WaterMeter.objects.create(name='Garden', meter_type='cold', user=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def run_import(self, lines, **kwargs):
+        stream = io.StringIO('meter,timestamp,value,image,notes\n' + ''.join(f'{line}\n' for line in lines))
+        return ReadingImporter(user=self.user, **kwargs).run(read_rows(stream, 'csv'))
+
+    def test_reimport_updates_in_place(self):
+        self.run_import(['Kitchen,2024-01-01T08:00:00+00:00,10,,first', 'Kitchen,2024-01-02T08:00:00+00:00,,,'])
+        result = self.run_import(['Kitchen,2024-01-01T08:00:00+00:00,11,,', 'Kitchen,2024-01-02T08:00:00+00:00,12,,'])
+        self.assertEqual((result.imported, result.errors), (2, []))
+        readings = list(WaterReading.objects.order_by('timestamp').values_list('reading_value', 'processed', 'notes'))
+        # An empty notes column leaves the existing notes alone
+        self.assertEqual(readings, [(Decimal('11'), True, 'first'), (Decimal('12'), True, '')])
+        self.assertEqual(self.snapshot(self.meter), (2, Decimal('12')))
+
+    def test_duplicates_within_a_batch_keep_the_last_row(self):
+        result = self.run_import([
+            'Kitchen,2024-01-01T08:00:00+00:00,10,,', 'Kitchen,2024-01-01T08:00:00+00:00,11,,',
+            f'{self.meter.pk},2024-01-01T08:00:00+00:00,12,,',
+        ])
+        self.assertEqual((result.rows, result.imported, result.duplicates), (3, 1, 2))
+        self.assertEqual(list(WaterReading.objects.values_list('reading_value', flat=True)), [Decimal('12')])
+
+    def test_stops_after_max_errors_and_keeps_written_batches(self):
+        lines = [f'Kitchen,2024-01-0{day}T08:00:00+00:00,{day},,' for day in range(1, 4)]
+        lines += ['Nowhere,2024-01-05T08:00:00+00:00,1,,', 'Kitchen,not a date,1,,', 'Kitchen,2024-01-06T08:00:00+00:00,-1,,']
+        with self.assertRaisesMessage(ReadingImportError, 'Stopped after 2 errors (first on line 5'):
+            self.run_import(lines, batch_size=2, max_errors=2)
+        # The first full batch was written, and its meter's snapshot rebuilt
+        self.assertEqual(self.snapshot(self.meter), (2, Decimal('2')))
+
+    def test_snapshots_rebuilt_once_per_meter(self):
+        lines = [f'{name},2024-01-{day:02d}T08:00:00+00:00,{day},,' for day in range(1, 11) for name in ('Kitchen', 'Garden')]
+        with mock.patch.object(WaterMeter, 'refresh_snapshot', autospec=True) as refresh_snapshot:
+            result = self.run_import(lines, batch_size=3)
+        self.assertEqual(result.imported, 20)
+        self.assertCountEqual([call.args[0].pk for call in refresh_snapshot.call_args_list], [self.meter.pk, self.other_meter.pk])
+
+    def test_image_must_exist_inside_media_storage(self):
+        default_storage.save('water_readings/kitchen.jpg', ContentFile(b'jpeg'))
+        result = self.run_import([
+            'Kitchen,2024-01-01T08:00:00+00:00,1,water_readings/kitchen.jpg,',
+            'Kitchen,2024-01-02T08:00:00+00:00,1,/etc/passwd,',
+            'Kitchen,2024-01-03T08:00:00+00:00,1,water_readings/../../secret.jpg,',
+            'Kitchen,2024-01-04T08:00:00+00:00,1,water_readings/missing.jpg,',
+        ])
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5])
+        self.assertEqual(WaterReading.objects.get().image.name, 'water_readings/kitchen.jpg')
+
+    def snapshot(self, meter):
+        meter.refresh_from_db()
+        return meter.reading_count, meter.latest_reading_value
+
+
+class RetentionAnalyticsTests(TestCase):
+    """Compacting old readings must not change what analytics report"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('retention', password='x', role='reader')
+        cls.meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=cls.user, cost_per_unit=Decimal('2'))
+        now = timezone.now()
+        # 1500 daily readings at one unit a day, with a month of faster use two years back
+        value, readings = Decimal('0'), []
+        for days_ago in range(1500, 0, -1):
+            value += 3 if 700 <= days_ago < 730 else 1
+            readings.append(WaterReading(
+                meter=cls.meter, image='water_readings/test.jpg', timestamp=now - timedelta(days=days_ago),
+                reading_value=value, processed=True,
+            ))
+        WaterReading.objects.bulk_create(readings)
+        cls.meter.refresh_snapshot()
+
+    def analytics(self):
+        data = _compute_usage_analytics([self.meter])[self.meter.name]
+        return {
+            'average_daily': round(data['average_daily'], 6),
+            'predicted_monthly_usage': round(data['predicted_monthly_usage'], 6),
+            'predicted_monthly_cost': round(data['predicted_monthly_cost'], 6),
+            'negative_count': data['negative_count'],
+            'total_usage': self.total_usage(),
+        }
+
+    def total_usage(self):
+        values = list(
+            WaterReading.objects.filter(meter=self.meter, processed=True)
+            .order_by('timestamp').values_list('reading_value', flat=True)
+        )
+        return sum(later - earlier for earlier, later in zip(values, values[1:]) if later > earlier)
+
+    def check_unchanged_by_retention(self):
+        before = self.analytics()
+        result = RetentionPolicy().run(WaterMeter.objects.filter(pk=self.meter.pk))
+        # Readings past RETENTION_MONTHLY_AFTER_DAYS collapse to one a month
+        self.assertGreater(result.archived, 350)
+        after = self.analytics()
+        self.assertEqual(after, before)
+        self.assertAlmostEqual(after['average_daily'], float(after['total_usage']) / 1499, places=6)
+
+    def test_predictions_and_totals_survive_compaction(self):
+        self.check_unchanged_by_retention()
+
+    @override_settings(SERIES_STORE=True)
+    def test_predictions_and_totals_survive_compaction_with_series_store(self):
+        rebuild_blocks(self.meter.pk)
+        self.check_unchanged_by_retention()
+
+
+class OcrQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('ocr', password='x', role='admin', is_staff=True, is_superuser=True)
+        cls.meter = WaterMeter.objects.create(name='Kitchen', meter_type='cold', user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        start = timezone.now() - timedelta(days=10)
+        self.readings = [
+            WaterReading.objects.create(
+                meter=self.meter, image=f'water_readings/{day}.jpg', timestamp=start + timedelta(days=day),
+            )
+            for day in range(4)
+        ]
+
+    def reader(self):
+        return mock.patch('utilities.services.GeminiWaterMeterReader')
+
+    def marked(self):
+        return set(WaterReading.objects.filter(ocr_requested_at__isnull=False).values_list('pk', flat=True))
+
+    def test_admin_action_marks_readings_in_the_database(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(OcrQueue, 'kick') as kick, self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/utilities/waterreading/', {
+                'action': 'rerun_ocr', '_selected_action': [reading.pk for reading in self.readings[:3]],
+            })
+        kick.assert_called_once_with()
+        self.assertEqual(self.marked(), {reading.pk for reading in self.readings[:3]})
+
+    def test_drain_works_through_marks_left_by_any_process(self):
+        request_ocr([reading.pk for reading in self.readings[:3]])
+        values = {'0.jpg': (10.0, None), '1.jpg': (None, None), '2.jpg': OSError('timeout')}
+
+        def extract(path, meter_type):
+            value = values[path.rsplit('/', 1)[-1]]
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        with self.reader() as reader_class:
+            reader_class.return_value.extract_reading_from_image.side_effect = extract
+            queue = OcrQueue()
+            queue._drain()
+        self.assertEqual((queue.processed, queue.failed), (2, 1))
+        # Read or unreadable, the mark is gone; the failed one waits for the next pass
+        self.assertEqual(self.marked(), {self.readings[2].pk})
+        self.readings[0].refresh_from_db()
+        self.assertEqual((self.readings[0].reading_value, self.readings[0].processed), (Decimal('10'), True))
+
+    def test_one_process_drains_at_a_time(self):
+        request_ocr(WaterReading.objects.all())
+        cache.add(DRAIN_LOCK, 'other worker')
+        with self.reader() as reader_class:
+            OcrQueue()._drain()
+        reader_class.assert_not_called()
+        self.assertEqual(len(self.marked()), 4)
+
+    def test_reprocess_selects_marks_and_clears_them(self):
+        request_ocr([self.readings[1].pk])
+        self.assertEqual(select_reading_ids(WaterMeter.objects.all(), 'requested'), [self.readings[1].pk])
+        # What each Reprocessor worker does per reading
+        reader = mock.Mock()
+        reader.extract_reading_from_image.return_value = (5.0, None)
+        reading = WaterReading.objects.select_related('meter').get(pk=self.readings[1].pk)
+        self.assertEqual(rerun_ocr(reading, reader), 5.0)
+        self.assertEqual(self.marked(), set())
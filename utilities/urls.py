@@ -1,16 +1,35 @@
-from django.urls import path
-from . import views
+from django.conf import settings
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from . import api, views
 
 app_name = 'utilities'
 
+router = DefaultRouter()
+router.register('meters', api.WaterMeterViewSet, basename='api-meter')
+router.register('readings', api.WaterReadingViewSet, basename='api-reading')
+
+if settings.ASYNC_VIEWS:
+    upload_reading = views.upload_reading_async
+    edit_reading = views.edit_reading_async
+    api_usage_data = views.api_usage_data_async
+else:
+    upload_reading = views.upload_reading
+    edit_reading = views.edit_reading
+    api_usage_data = views.api_usage_data
+
 urlpatterns = [
-    path('upload/', views.upload_reading, name='upload_reading'),
+    path('upload/', upload_reading, name='upload_reading'),
     path('readings/', views.readings_list, name='readings_list'),
-    path('readings/<int:reading_id>/edit/', views.edit_reading, name='edit_reading'),
+    path('readings/export/', views.export_readings, name='export_readings'),
+    path('readings/<int:reading_id>/edit/', edit_reading, name='edit_reading'),
     path('readings/<int:reading_id>/delete/', views.delete_reading, name='delete_reading'),
     path('meters/', views.meter_management, name='meter_management'),
     path('meters/<int:meter_id>/edit/', views.edit_meter, name='edit_meter'),
     path('meters/<int:meter_id>/delete/', views.delete_meter, name='delete_meter'),
     path('analytics/', views.usage_analytics, name='usage_analytics'),
-    path('api/usage-data/', views.api_usage_data, name='api_usage_data'),
+    path('api/usage-data/', api_usage_data, name='api_usage_data'),
+    path('events/', views.reading_events, name='reading_events'),
+    path('api/sync/', api.SyncView.as_view(), name='api_sync'),
+    path('api/', include(router.urls)),
 ]
\ No newline at end of file
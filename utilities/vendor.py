@@ -0,0 +1,60 @@
+"""
+Pinned third-party CSS, JS and fonts, served from static/vendor/.
+
+``manage.py vendor_static`` downloads them; the directory is not committed.
+Until it has run, ``manage.py check`` warns, and with DEBUG on the
+``{% vendor_static %}`` tag links the same pinned files on their CDN so pages
+still render. With DEBUG off a missing file is an error, as for any static
+file.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core import checks
+
+BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist'
+FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0'
+CROPPERJS = 'https://cdn.jsdelivr.net/npm/cropperjs@1.6.2/dist'
+
+# Third-party assets served from static/vendor/, pinned to the versions the templates were written against
+VENDOR_ASSETS = {
+    'vendor/bootstrap/bootstrap.min.css': f'{BOOTSTRAP}/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js': f'{BOOTSTRAP}/js/bootstrap.bundle.min.js',
+    'vendor/fontawesome/css/all.min.css': f'{FONT_AWESOME}/css/all.min.css',
+    **{
+        f'vendor/fontawesome/webfonts/{font}.{ext}': f'{FONT_AWESOME}/webfonts/{font}.{ext}'
+        for font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+        for ext in ('woff2', 'ttf')
+    },
+    'vendor/cropperjs/cropper.min.css': f'{CROPPERJS}/cropper.min.css',
+    'vendor/cropperjs/cropper.min.js': f'{CROPPERJS}/cropper.min.js',
+    'vendor/exif-js/exif.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/exif-js/2.3.0/exif.min.js',
+    # The analytics charts only use scatter traces, which the basic bundle covers at a third of the size
+    'vendor/plotly/plotly-basic.min.js': 'https://cdn.plot.ly/plotly-basic-2.29.1.min.js',
+}
+
+
+def vendor_path(name):
+    return Path(settings.STATICFILES_DIRS[0]) / name
+
+
+def missing_vendor_assets():
+    return [name for name in VENDOR_ASSETS if not vendor_path(name).exists()]
+
+
+def vendor_url(name):
+    """The pinned CDN URL of a vendored asset, for when static/vendor/ has not been populated"""
+    return VENDOR_ASSETS[name]
+
+
+@checks.register(checks.Tags.staticfiles)
+def check_vendor_assets(app_configs, **kwargs):
+    missing = missing_vendor_assets()
+    if not missing:
+        return []
+    return [checks.Warning(
+        f'{len(missing)} vendored static file(s) are missing, e.g. {missing[0]}.',
+        hint="Run 'python manage.py vendor_static'. Until then DEBUG pages load them from their CDN.",
+        id='utilities.W001',
+    )]